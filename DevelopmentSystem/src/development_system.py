@@ -4,6 +4,7 @@ from threading import Thread
 from jsonschema import validate, ValidationError
 
 from src.early_training_controller import EarlyTrainingController
+from src.incremental_update_controller import IncrementalUpdateController, INCREMENTAL_CLASSIFIER
 from src.json_io import JsonIO
 from src.learning_session_store import LearningSessionStore
 from src.mental_command_classifier import MentalCommandClassifier
@@ -11,8 +12,9 @@ from src.test_controller import TestController
 from src.validation_controller import ValidationController
 from utility.logging import info, error, success, warning
 
-ACCEPTED_OPERATIONAL_MODES = ['waiting_for_dataset', 'early_training', 'check_early_training_report', 'grid_search',
-                              'check_top_five_classifiers_report', 'test_best_classifier', 'check_test_report']
+ACCEPTED_OPERATIONAL_MODES = ['waiting_for_dataset', 'incremental_update', 'early_training',
+                              'check_early_training_report', 'grid_search', 'check_top_five_classifiers_report',
+                              'test_best_classifier', 'check_test_report']
 
 
 class DevelopmentSystem:
@@ -60,26 +62,50 @@ class DevelopmentSystem:
                 if res is False:
                     continue
 
-                # create JSON file containing the number of generations
-                with open(os.path.join(os.path.abspath('..'), 'data', 'number_of_generations.json'), "w") as f:
-                    json.dump({'number_of_generations': self.config['initial_number_of_generations']}, f, indent=4)
+                # update the best classifier with the new dataset if possible, otherwise start a new development
+                if self.config.get('incremental_update', {}).get('enabled', False) and \
+                        IncrementalUpdateController.is_available():
+                    self._change_operational_mode('incremental_update')
+                else:
+                    self._start_early_training()
+
+            # ====================== Incremental update ======================
 
-                # change operational mode to early training
-                self._change_operational_mode('early_training')
+            if self.config['operational_mode'] == 'incremental_update':
+                # get training and test sets from learning session store
+                training_dataset = self._learning_session_store.get_training_set()
+                test_dataset = self._learning_session_store.get_test_set()
+
+                # continue the training of the best classifier, it goes to the test only if its test error
+                # doesn't exceed the threshold
+                incremental_update_controller = IncrementalUpdateController(
+                    number_of_generations=self.config['incremental_update'].get('number_of_generations', 10))
+                if incremental_update_controller.run(dataset=training_dataset | test_dataset,
+                                                     test_error_threshold=self.config['test_error_threshold']):
+                    success('Best Classifier updated with the new dataset')
+                    self.mental_command_classifier = incremental_update_controller.mental_command_classifier
+                    self._change_operational_mode('test_best_classifier')
+                else:
+                    warning('The updated Best Classifier exceeds the test error threshold, restart from Early Training')
+                    self._start_early_training()
 
             # ====================== Early training =======================
 
             if self.config['operational_mode'] == 'early_training':
-                # get dataset from learning session store
+                # get training and validation sets from learning session store
                 training_dataset = self._learning_session_store.get_training_set()
+                validation_dataset = self._learning_session_store.get_validation_set()
 
                 # start the early training controller
                 EarlyTrainingController(mental_command_classifier=self.mental_command_classifier,
                                         number_of_hidden_layers_range=self.config['number_of_hidden_layers_range'],
-                                        number_of_hidden_neurons_range=self.config['number_of_hidden_neurons_range']) \
+                                        number_of_hidden_neurons_range=self.config['number_of_hidden_neurons_range'],
+                                        seed=self.config.get('seed'),
+                                        early_stopping=self.config.get('early_stopping')) \
                     .run(operational_mode=self.config['operational_mode'],
                          testing=self.config['testing_mode'],
-                         training_dataset=training_dataset)
+                         training_dataset=training_dataset,
+                         validation_dataset=validation_dataset)
 
                 # change operational mode and stop (if testing mode instead continue)
                 self._change_operational_mode('check_early_training_report')
@@ -95,6 +121,7 @@ class DevelopmentSystem:
                 report_evaluation = EarlyTrainingController().run(operational_mode=self.config['operational_mode'])
                 if report_evaluation is True:
                     success('The Number of Generations is good, Early Training ended')
+                    EarlyTrainingController.remove_early_training()
                     self._change_operational_mode('grid_search')
                 else:
                     warning('The Number of Generations has changed, restart from Early Training')
@@ -110,7 +137,14 @@ class DevelopmentSystem:
                 # start the validation controller
                 ValidationController(mental_command_classifier=self.mental_command_classifier,
                                      number_of_hidden_layers_range=self.config['number_of_hidden_layers_range'],
-                                     number_of_hidden_neurons_range=self.config['number_of_hidden_neurons_range']) \
+                                     number_of_hidden_neurons_range=self.config['number_of_hidden_neurons_range'],
+                                     number_of_workers=self.config.get('grid_search_workers'),
+                                     seed=self.config.get('seed'),
+                                     search_mode=self.config.get('search_mode', 'grid'),
+                                     halving_factor=self.config.get('halving_factor', 3),
+                                     checkpoint_interval=self.config.get('checkpoint_interval', 10),
+                                     dataset_hash=self._learning_session_store.get_dataset_hash(),
+                                     result_cache=self.config.get('result_cache')) \
                     .run(operational_mode=self.config['operational_mode'],
                          testing=self.config['testing_mode'],
                          dataset=training_dataset | validation_dataset,
@@ -156,7 +190,7 @@ class DevelopmentSystem:
             if self.config['operational_mode'] == 'test_best_classifier':
                 # load the classifier from disk if None (recovery from crash during test)
                 if self.mental_command_classifier is None:
-                    self.mental_command_classifier = MentalCommandClassifier(file_name='best_classifier.sav')
+                    self.mental_command_classifier = MentalCommandClassifier(file_name=self._tested_classifier())
 
                 # get training and test sets from database
                 training_dataset = self._learning_session_store.get_training_set()
@@ -183,7 +217,7 @@ class DevelopmentSystem:
 
             if self.config['operational_mode'] == 'check_test_report':
                 # load the classifier from disk
-                self.mental_command_classifier = MentalCommandClassifier(file_name='best_classifier.sav')
+                self.mental_command_classifier = MentalCommandClassifier(file_name=self._tested_classifier())
 
                 # the test controller will return the ML Engineer evaluation
                 report_evaluation = TestController(mental_command_classifier=self.mental_command_classifier) \
@@ -191,6 +225,10 @@ class DevelopmentSystem:
                 if report_evaluation is True:
                     info('The Best Classifier is valid, can be sent to Execution System')
 
+                    # an updated best classifier replaces the previous one only now
+                    if IncrementalUpdateController.is_pending():
+                        IncrementalUpdateController.accept_update()
+
                     # send serialized classifier to execution system
                     serialized_classifier = self.mental_command_classifier.serialize()
                     JsonIO.get_instance().send(ip_endpoint=self.config['ip_endpoint'],
@@ -201,6 +239,7 @@ class DevelopmentSystem:
                     self._change_operational_mode('waiting_for_dataset')
                 else:
                     warning('The Best Classifier isn\'t valid, Reconfiguration of the Systems are needed')
+                    IncrementalUpdateController.discard_update()
                     self._change_operational_mode('waiting_for_dataset')
 
                     # if not in testing mode stop, otherwise restart from waiting dataset
@@ -221,6 +260,24 @@ class DevelopmentSystem:
 
         info(f'Switch to \'{new_mode}\' operational mode')
 
+    @staticmethod
+    def _tested_classifier() -> str:
+        # the updated best classifier is tested instead of the best classifier, if there is one
+        if IncrementalUpdateController.is_pending():
+            return INCREMENTAL_CLASSIFIER
+        return 'best_classifier.sav'
+
+    def _start_early_training(self) -> None:
+        # the early training of the previous dataset isn't continued
+        EarlyTrainingController.remove_early_training()
+
+        # create JSON file containing the number of generations
+        with open(os.path.join(os.path.abspath('..'), 'data', 'number_of_generations.json'), "w") as f:
+            json.dump({'number_of_generations': self.config['initial_number_of_generations']}, f, indent=4)
+
+        # change operational mode to early training
+        self._change_operational_mode('early_training')
+
     def _remove_serialized_classifiers(self) -> None:
         path = os.path.join(os.path.abspath('..'), 'data')
 
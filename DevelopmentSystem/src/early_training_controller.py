@@ -1,3 +1,4 @@
+import copy
 import json
 import math
 import os
@@ -8,26 +9,39 @@ from src.mental_command_classifier import MentalCommandClassifier
 from utility.logging import info, error, trace
 
 
+# classifier of the last early training and its validation losses, continued by the next early training
+EARLY_TRAINING_CLASSIFIER = 'early_training_classifier.sav'
+EARLY_TRAINING_STATE = 'early_training_state.json'
+
+
 class EarlyTrainingController:
 
     def __init__(self, mental_command_classifier: MentalCommandClassifier = None,
-                 number_of_hidden_layers_range: list = None, number_of_hidden_neurons_range: list = None) -> None:
+                 number_of_hidden_layers_range: list = None, number_of_hidden_neurons_range: list = None,
+                 seed: int = None, early_stopping: dict = None) -> None:
         self.mental_command_classifier = mental_command_classifier
         self.number_of_hidden_layers_range = number_of_hidden_layers_range
         self.number_of_hidden_neurons_range = number_of_hidden_neurons_range
+        self._seed = seed
+        self._early_stopping = early_stopping if early_stopping is not None else {'enabled': False}
 
-    def run(self, operational_mode: str, testing: bool = False, training_dataset: dict = None) -> bool:
+    def run(self, operational_mode: str, testing: bool = False, training_dataset: dict = None,
+            validation_dataset: dict = None) -> bool:
         if operational_mode == 'early_training':
             # get the average number of hidden layer
             training_parameters = self._generate_training_parameters()
 
-            # generate the first classifier
-            self.mental_command_classifier = MentalCommandClassifier(uuid=0, training_parameters=training_parameters)
-
-            # train the classifier
-            self.mental_command_classifier.train_classifier(training_data=training_dataset['training_data'],
-                                                            training_labels=training_dataset['training_labels'])
+            # train the classifier, continuing the classifier of the previous early training if possible
+            validation_losses = None
+            suggested_number_of_generations = None
+            if self._early_stopping['enabled'] and validation_dataset is not None:
+                losses, validation_losses = self._train_with_early_stopping(training_parameters, training_dataset,
+                                                                            validation_dataset)
+                suggested_number_of_generations = training_parameters['number_of_generations']
+            else:
+                losses = self._train(training_parameters, training_dataset)
             info('Early Training completed')
+            self._store_early_training(validation_losses, suggested_number_of_generations)
 
             # generate the report
             training_error = self.mental_command_classifier.get_error(data=training_dataset['training_data'],
@@ -37,11 +51,115 @@ class EarlyTrainingController:
                                                            testing=testing)
 
             # generate the gradient descent plot
-            GradientDescentPlotGenerator().generate_plot(losses=self.mental_command_classifier.get_losses())
+            GradientDescentPlotGenerator().generate_plot(losses=losses, validation_losses=validation_losses)
 
         elif operational_mode == 'check_early_training_report':
             return EarlyTrainingReportGenerator().evaluate_report()
 
+    def _train(self, training_parameters: dict, training_dataset: dict) -> list:
+        # the previous classifier is trained only for the missing generations, a new classifier is trained
+        # from zero if there isn't a previous one or if it was trained for more generations
+        number_of_generations = training_parameters['number_of_generations']
+        previous_state = self._load_early_training(training_parameters)
+        if previous_state is not None and len(self.mental_command_classifier.get_losses()) <= number_of_generations:
+            trained_generations = len(self.mental_command_classifier.get_losses())
+            trace(f'Early Training continued from generation {trained_generations}')
+            for _ in range(number_of_generations - trained_generations):
+                self.mental_command_classifier.train_generation(training_data=training_dataset['training_data'],
+                                                                training_labels=training_dataset['training_labels'])
+        else:
+            self.mental_command_classifier = MentalCommandClassifier(uuid=0, training_parameters=training_parameters)
+            self.mental_command_classifier.train_classifier(training_data=training_dataset['training_data'],
+                                                            training_labels=training_dataset['training_labels'])
+        return self.mental_command_classifier.get_losses()
+
+    def _train_with_early_stopping(self, training_parameters: dict, training_dataset: dict,
+                                   validation_dataset: dict) -> tuple:
+        # train one generation at a time up to the maximum number of generations, stopping when the validation
+        # loss doesn't improve by more than min_delta for patience generations. The classifier is restored
+        # to the generation with the lowest validation loss, suggested as the new number of generations.
+        # The maximum is the number of generations or max_generations if greater, so the suggestion doesn't
+        # prevent the next early trainings from training more generations. A number of generations different
+        # from the last suggestion has been set by the ML Engineer and it's the maximum
+        patience = self._early_stopping.get('patience', 10)
+        min_delta = self._early_stopping.get('min_delta', 0.0)
+        previous_state = self._load_early_training(training_parameters)
+        if previous_state is not None and previous_state.get('suggested_number_of_generations') not in \
+                [None, training_parameters['number_of_generations']]:
+            max_generations = training_parameters['number_of_generations']
+            info(f'Early Training limited to the {max_generations} generations set by the ML Engineer')
+        else:
+            max_generations = max(training_parameters['number_of_generations'],
+                                  self._early_stopping.get('max_generations', 0))
+
+        # the previous classifier is the best one of its early training, it's continued if it has been
+        # trained with early stopping (its validation losses are known)
+        if previous_state is not None and previous_state['validation_losses'] is not None and \
+                len(previous_state['validation_losses']) == len(self.mental_command_classifier.get_losses()) <= \
+                max_generations:
+            validation_losses = previous_state['validation_losses']
+            trace(f'Early Training continued from generation {len(validation_losses)}')
+        else:
+            self.mental_command_classifier = MentalCommandClassifier(uuid=0, training_parameters=training_parameters)
+            validation_losses = []
+
+        best_generation = len(validation_losses)
+        best_classifier = copy.deepcopy(self.mental_command_classifier.get_classifier())
+        for generation in range(len(validation_losses) + 1, max_generations + 1):
+            self.mental_command_classifier.train_generation(training_data=training_dataset['training_data'],
+                                                            training_labels=training_dataset['training_labels'])
+            validation_losses.append(self.mental_command_classifier.get_loss(
+                data=validation_dataset['validation_data'], label=validation_dataset['validation_labels']))
+            if best_generation == 0 or validation_losses[-1] < validation_losses[best_generation - 1] - min_delta:
+                best_generation = generation
+                best_classifier = copy.deepcopy(self.mental_command_classifier.get_classifier())
+            elif generation - best_generation >= patience:
+                break
+        info(f'Validation loss plateaued at generation {best_generation} '
+             f'(stopped after {len(validation_losses)} generations)')
+
+        # the losses of all the trained generations are plotted, the report describes the restored classifier
+        losses = self.mental_command_classifier.get_losses()
+        self.mental_command_classifier.set_classifier(best_classifier)
+        training_parameters['number_of_generations'] = best_generation
+
+        # the suggested number of generations is used by the grid search if the report is accepted
+        with open(os.path.join(os.path.abspath('..'), 'data', 'number_of_generations.json'), 'w') as f:
+            json.dump({'number_of_generations': best_generation}, f, indent=4)
+        return losses, validation_losses
+
+    def _load_early_training(self, training_parameters: dict) -> dict:
+        # load the classifier of the previous early training, if it has the same hidden layers
+        try:
+            with open(os.path.join(os.path.abspath('..'), 'data', EARLY_TRAINING_STATE)) as f:
+                state = json.load(f)
+            mental_command_classifier = MentalCommandClassifier(file_name=EARLY_TRAINING_CLASSIFIER)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if tuple(mental_command_classifier.get_hidden_layer_sizes()) != \
+                tuple(training_parameters['hidden_layer_sizes']):
+            return None
+        self.mental_command_classifier = mental_command_classifier
+        return state
+
+    def _store_early_training(self, validation_losses: list, suggested_number_of_generations: int = None) -> None:
+        # the validation losses are stored up to the generation of the classifier, with the suggested number
+        # of generations to recognize a number of generations changed by the ML Engineer
+        if validation_losses is not None:
+            validation_losses = validation_losses[:len(self.mental_command_classifier.get_losses())]
+        self.mental_command_classifier.store(file_name=EARLY_TRAINING_CLASSIFIER)
+        with open(os.path.join(os.path.abspath('..'), 'data', EARLY_TRAINING_STATE), 'w') as f:
+            json.dump({'validation_losses': validation_losses,
+                       'suggested_number_of_generations': suggested_number_of_generations}, f)
+
+    @staticmethod
+    def remove_early_training() -> None:
+        # the next early training starts from zero (new dataset or early training ended)
+        for file_name in [EARLY_TRAINING_CLASSIFIER, EARLY_TRAINING_STATE]:
+            path = os.path.join(os.path.abspath('..'), 'data', file_name)
+            if os.path.exists(path):
+                os.remove(path)
+
     def _generate_training_parameters(self) -> dict:
         # load number of generations file and schema
         with open(os.path.join(os.path.abspath('..'), 'data', 'number_of_generations.json')) as f:
@@ -65,4 +183,5 @@ class EarlyTrainingController:
         hidden_layer_sizes = tuple([math.ceil(average_neurons / (2 ** i)) for i in range(average_layers)])
         trace(f'The Early Training Network has this hidden layer sizes: {hidden_layer_sizes}')
 
-        return {'number_of_generations': number_of_generations, 'hidden_layer_sizes': hidden_layer_sizes}
+        return {'number_of_generations': number_of_generations, 'hidden_layer_sizes': hidden_layer_sizes,
+                'seed': self._seed}
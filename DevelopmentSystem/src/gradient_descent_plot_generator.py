@@ -9,9 +9,12 @@ class GradientDescentPlotGenerator:
     def __init__(self) -> None:
         self._image_path = os.path.join(os.path.abspath('..'), 'data', 'gradient_descent_plot.png')
 
-    def generate_plot(self, losses: list) -> None:
+    def generate_plot(self, losses: list, validation_losses: list = None) -> None:
         # plot
-        plt.plot(range(1, len(losses) + 1), losses)
+        plt.plot(range(1, len(losses) + 1), losses, label='Training')
+        if validation_losses is not None:
+            plt.plot(range(1, len(validation_losses) + 1), validation_losses, label='Validation')
+            plt.legend()
         plt.xlabel('Iterations')
         plt.ylabel('Loss Function')
 
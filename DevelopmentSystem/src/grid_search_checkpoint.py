@@ -0,0 +1,75 @@
+import json
+import os
+
+from utility.logging import info, error
+
+# format of the results keys (round number and uuid), the checkpoints of other formats aren't resumed
+CHECKPOINT_VERSION = 2
+
+
+class GridSearchCheckpoint:
+
+    def __init__(self, search: dict, interval: int = 10) -> None:
+        # the checkpoint is valid only for the same search (dataset, generations, combinations, seed and mode)
+        self._path = os.path.join(os.path.abspath('..'), 'data', 'grid_search_checkpoint.json')
+        self._search = json.loads(json.dumps(search))
+        self._interval = interval
+        self._results = {}
+        self._top_classifiers = []
+        self._new_results = 0
+
+    def load(self) -> bool:
+        # load the results of the search interrupted by a crash
+        if self._interval <= 0:
+            return False
+        try:
+            with open(self._path) as f:
+                checkpoint = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+
+        if checkpoint.get('version') != CHECKPOINT_VERSION or checkpoint.get('search') != self._search:
+            return False
+        self._results = checkpoint['results']
+        self._top_classifiers = checkpoint['top_classifiers']
+        info(f'Grid Search resumed from the checkpoint with {len(self._results)} trained candidates')
+        return True
+
+    def reset(self) -> None:
+        # discard the loaded results
+        self._results = {}
+        self._top_classifiers = []
+
+    def get_result(self, round_number: int, uuid: int) -> list:
+        # [training_error, validation_error] of a candidate already trained in the round (the successive halving
+        # rounds are numbered from 1, the training with all the generations is the round 0)
+        return self._results.get(f'{round_number}:{uuid}')
+
+    def get_top_classifiers(self) -> list:
+        # [uuid, training_error, validation_error] of the top classifiers stored with the checkpoint
+        return self._top_classifiers
+
+    def add_result(self, round_number: int, uuid: int, training_error: float, validation_error: float) -> bool:
+        # return True if the checkpoint has to be saved
+        self._results[f'{round_number}:{uuid}'] = [training_error, validation_error]
+        self._new_results += 1
+        return 0 < self._interval <= self._new_results
+
+    def save(self, top_classifiers: list) -> None:
+        # the checkpoint is replaced atomically, the top classifiers must be already stored on disk
+        self._top_classifiers = top_classifiers
+        self._new_results = 0
+        checkpoint = {'version': CHECKPOINT_VERSION, 'search': self._search, 'results': self._results,
+                      'top_classifiers': top_classifiers}
+        try:
+            with open(self._path + '.tmp', 'w') as f:
+                json.dump(checkpoint, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(self._path + '.tmp', self._path)
+        except OSError:
+            error('Failed to save the Grid Search checkpoint')
+
+    def remove(self) -> None:
+        if os.path.exists(self._path):
+            os.remove(self._path)
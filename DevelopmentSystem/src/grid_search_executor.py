@@ -0,0 +1,131 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from src.grid_search_result_cache import GridSearchResultCache
+from src.mental_command_classifier import MentalCommandClassifier
+from utility.logging import info, trace
+
+# names of the dataset arrays used by the grid search
+DATASET_ARRAYS = ['training_data', 'training_labels', 'validation_data', 'validation_labels']
+
+# dataset of the worker processes, memory mapped from the snapshot written by the executor
+_worker_dataset = None
+
+
+def _init_worker(*snapshot_paths: str) -> None:
+    global _worker_dataset
+    _worker_dataset = {name: np.load(path, mmap_mode='r') for name, path in zip(DATASET_ARRAYS, snapshot_paths)}
+
+
+def _train_candidate(uuid: int, training_parameters: dict) -> tuple:
+    return _evaluate_candidate(_worker_dataset, uuid, training_parameters)
+
+
+def _evaluate_candidate(dataset: dict, uuid: int, training_parameters: dict) -> tuple:
+    # create and train a classifier with the candidate parameters, the training and validation errors
+    # are computed once, right after the training
+    mental_command_classifier = MentalCommandClassifier(uuid=uuid, training_parameters=training_parameters)
+    if training_parameters.get('trained_classifier') is not None:
+        # warm start from the same candidate trained with fewer generations
+        mental_command_classifier.continue_training(training_parameters['trained_classifier'],
+                                                    dataset['training_data'], dataset['training_labels'])
+    else:
+        mental_command_classifier.train_classifier(dataset['training_data'], dataset['training_labels'])
+    training_error = mental_command_classifier.get_error(dataset['training_data'], dataset['training_labels'])
+    validation_error = mental_command_classifier.get_error(dataset['validation_data'], dataset['validation_labels'])
+    return mental_command_classifier, training_error, validation_error
+
+
+class GridSearchExecutor:
+
+    def __init__(self, number_of_workers: int = None) -> None:
+        # the pool is sized to the machine if the number of workers isn't given
+        self._number_of_workers = number_of_workers or os.cpu_count() or 1
+
+    def run(self, candidates: list, dataset: dict, on_result, result_cache: GridSearchResultCache = None,
+            need_models: bool = True) -> None:
+        # train the candidates (list of (uuid, training parameters)) and pass each trained classifier with its
+        # training and validation errors to on_result(uuid, classifier, training_error, validation_error),
+        # the classifiers are passed in the order of the candidates whatever the completion order
+        results = {}
+        trainings = []
+        for index, (uuid, training_parameters) in enumerate(candidates):
+            if result_cache is None or not result_cache.is_cacheable(training_parameters):
+                trainings.append((index, uuid, training_parameters))
+                continue
+
+            # the cached results are used as they are (the classifier is None if the model isn't needed),
+            # the others are trained, starting from the cached model with fewer generations if any
+            cached_result = result_cache.get(training_parameters, need_model=need_models)
+            if cached_result is not None:
+                mental_command_classifier = None
+                if cached_result[0] is not None:
+                    mental_command_classifier = MentalCommandClassifier(uuid=uuid)
+                    mental_command_classifier.set_classifier(cached_result[0])
+                results[index] = (mental_command_classifier, cached_result[1], cached_result[2])
+            else:
+                trainings.append((index, uuid, training_parameters |
+                                  {'trained_classifier': result_cache.get_warm_start_model(training_parameters)}))
+        if len(results) > 0:
+            info(f'{len(results)} of {len(candidates)} candidates found in the result cache')
+
+        # completed classifiers wait in the buffer until all the previous ones are passed
+        next_index = 0
+
+        def flush() -> None:
+            nonlocal next_index
+            while next_index in results:
+                on_result(candidates[next_index][0], *results.pop(next_index))
+                next_index += 1
+
+        def complete(index: int, result: tuple) -> None:
+            if result_cache is not None and result_cache.is_cacheable(candidates[index][1]):
+                result_cache.put(candidates[index][1], result[0].get_classifier(), result[1], result[2])
+            results[index] = result
+            flush()
+
+        flush()
+
+        if self._number_of_workers == 1 or len(trainings) <= 1:
+            arrays = self._to_arrays(dataset)
+            for counter, (index, uuid, training_parameters) in enumerate(trainings, 1):
+                complete(index, _evaluate_candidate(arrays, uuid, training_parameters))
+                trace(f'{round((counter / len(trainings)) * 100)}% of Grid Search completed')
+            return
+
+        # the workers share the training set through memory mapped files instead of receiving a copy of it
+        snapshot_paths, temporary_paths = self._write_snapshot(dataset)
+        try:
+            with ProcessPoolExecutor(max_workers=self._number_of_workers, initializer=_init_worker,
+                                     initargs=snapshot_paths) as executor:
+                futures = {executor.submit(_train_candidate, uuid, training_parameters): index
+                           for index, uuid, training_parameters in trainings}
+                for counter, future in enumerate(as_completed(futures), 1):
+                    complete(futures[future], future.result())
+                    trace(f'{round((counter / len(trainings)) * 100)}% of Grid Search completed')
+        finally:
+            for path in temporary_paths:
+                os.remove(path)
+
+    @staticmethod
+    def _to_arrays(dataset: dict) -> dict:
+        # float32 features and flat labels
+        return {name: np.asarray(dataset[name], dtype=np.float32) if name.endswith('_data')
+                else np.asarray(dataset[name]).ravel() for name in DATASET_ARRAYS}
+
+    def _write_snapshot(self, dataset: dict) -> tuple:
+        # the memory mapped arrays (snapshot of the learning session store) are shared as they are,
+        # the other arrays are written to temporary files
+        data_path = os.path.join(os.path.abspath('..'), 'data')
+        snapshot_paths = []
+        temporary_paths = []
+        for name, array in self._to_arrays(dataset).items():
+            if isinstance(dataset[name], np.memmap) and dataset[name].dtype == array.dtype:
+                snapshot_paths.append(dataset[name].filename)
+                continue
+            snapshot_paths.append(os.path.join(data_path, f'grid_search_{name}.npy'))
+            temporary_paths.append(snapshot_paths[-1])
+            np.save(snapshot_paths[-1], array)
+        return tuple(snapshot_paths), temporary_paths
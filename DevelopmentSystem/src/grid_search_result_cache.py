@@ -0,0 +1,91 @@
+import os
+import pickle
+import sqlite3
+
+from sklearn.neural_network import MLPClassifier
+
+from utility.logging import error, trace
+
+
+class GridSearchResultCache:
+
+    def __init__(self, dataset_hash: str, store_models: bool = False, warm_start: bool = False,
+                 prune_other_datasets: bool = False) -> None:
+        # results of the candidates trained on the dataset, keyed by (hidden_layer_sizes, max_iter, seed)
+        self._dataset_hash = dataset_hash
+        self._store_models = store_models
+        self._warm_start = warm_start
+        # results of the search not written yet, they are written all together by flush()
+        self._pending_results = {}
+        self._conn = sqlite3.connect(os.path.join(os.path.abspath('..'), 'data', 'result_cache.db'))
+        try:
+            self._conn.cursor().execute('CREATE TABLE IF NOT EXISTS result_cache (DATASET_HASH TEXT, '
+                                        'HIDDEN_LAYER_SIZES TEXT, MAX_ITER INTEGER, SEED INTEGER, '
+                                        'TRAINING_ERROR REAL, VALIDATION_ERROR REAL, MODEL BLOB, '
+                                        'PRIMARY KEY (DATASET_HASH, HIDDEN_LAYER_SIZES, MAX_ITER, SEED));')
+            # the results of the other datasets (no longer in the learning session store) are deleted only
+            # if requested, the cache can be shared by datasets that come back
+            if prune_other_datasets:
+                self._conn.cursor().execute('DELETE FROM result_cache WHERE DATASET_HASH != ?', (dataset_hash,))
+            self._conn.commit()
+        except sqlite3.Error:
+            error('Failed to create the result cache table')
+
+    @staticmethod
+    def is_cacheable(training_parameters: dict) -> bool:
+        # only the deterministic trainings (with a seed) can be reused
+        return training_parameters.get('seed') is not None
+
+    def get(self, training_parameters: dict, need_model: bool = True) -> tuple:
+        # (model, training_error, validation_error) of the candidate, None if it isn't cached
+        # (or if the model is needed and it wasn't stored)
+        if self._key(training_parameters) in self._pending_results:
+            res = self._pending_results[self._key(training_parameters)]
+            if need_model and res[2] is None:
+                return None
+            return (None if res[2] is None else pickle.loads(res[2])), res[0], res[1]
+        query = 'SELECT MODEL, TRAINING_ERROR, VALIDATION_ERROR FROM result_cache WHERE DATASET_HASH = ? ' \
+                'AND HIDDEN_LAYER_SIZES = ? AND MAX_ITER = ? AND SEED = ?'
+        try:
+            res = self._conn.cursor().execute(query, self._key(training_parameters)).fetchone()
+        except sqlite3.Error:
+            return None
+        if res is None or (need_model and res[0] is None):
+            return None
+        return (None if res[0] is None else pickle.loads(res[0])), res[1], res[2]
+
+    def get_warm_start_model(self, training_parameters: dict) -> MLPClassifier:
+        # the model of the same candidate trained with the most generations fewer than the required ones
+        if not self._warm_start:
+            return None
+        query = 'SELECT MODEL FROM result_cache WHERE DATASET_HASH = ? AND HIDDEN_LAYER_SIZES = ? ' \
+                'AND MAX_ITER < ? AND SEED = ? AND MODEL IS NOT NULL ORDER BY MAX_ITER DESC LIMIT 1'
+        try:
+            res = self._conn.cursor().execute(query, self._key(training_parameters)).fetchone()
+        except sqlite3.Error:
+            return None
+        return None if res is None else pickle.loads(res[0])
+
+    def put(self, training_parameters: dict, model: MLPClassifier, training_error: float,
+            validation_error: float) -> None:
+        model = pickle.dumps(model) if self._store_models and model is not None else None
+        self._pending_results[self._key(training_parameters)] = (training_error, validation_error, model)
+
+    def flush(self) -> None:
+        # write the results of the search with a single commit
+        if len(self._pending_results) == 0:
+            return
+        try:
+            self._conn.cursor().executemany('INSERT OR REPLACE INTO result_cache VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                            [key + result for key, result in self._pending_results.items()])
+            self._conn.commit()
+        except sqlite3.Error:
+            error('Failed to insert the results in the cache')
+            return
+        trace(f'Cached {len(self._pending_results)} Grid Search results')
+        self._pending_results = {}
+
+    def _key(self, training_parameters: dict) -> tuple:
+        hidden_layer_sizes = ','.join(str(size) for size in training_parameters['hidden_layer_sizes'])
+        return (self._dataset_hash, hidden_layer_sizes, training_parameters['number_of_generations'],
+                training_parameters['seed'])
@@ -0,0 +1,55 @@
+import os
+
+from src.mental_command_classifier import MentalCommandClassifier
+from utility.logging import info, trace
+
+# updated best classifier waiting for the evaluation of the test report
+INCREMENTAL_CLASSIFIER = 'incremental_classifier.sav'
+
+
+class IncrementalUpdateController:
+
+    def __init__(self, number_of_generations: int = 10) -> None:
+        self.mental_command_classifier = None
+        self._number_of_generations = number_of_generations
+
+    @staticmethod
+    def is_available() -> bool:
+        # the update needs a best classifier from a previous development
+        return os.path.exists(os.path.join(os.path.abspath('..'), 'data', 'best_classifier.sav'))
+
+    def run(self, dataset: dict, test_error_threshold: float) -> bool:
+        # continue the training of the best classifier on the new training set
+        self.mental_command_classifier = MentalCommandClassifier(file_name='best_classifier.sav')
+        for generation in range(self._number_of_generations):
+            self.mental_command_classifier.train_generation(training_data=dataset['training_data'],
+                                                            training_labels=dataset['training_labels'])
+        info(f'Best Classifier updated with {self._number_of_generations} generations on the new dataset')
+
+        # get_error is the accuracy (higher is better), the update is rejected if the fraction of misclassified
+        # test sessions is over the threshold and a new development is needed
+        accuracy = self.mental_command_classifier.get_error(data=dataset['test_data'], label=dataset['test_labels'])
+        trace(f'Updated Best Classifier test accuracy: {accuracy} (misclassified: {1 - accuracy})')
+        if 1 - accuracy > test_error_threshold:
+            self.discard_update()
+            return False
+
+        # the best classifier is replaced only when the test report is accepted
+        self.mental_command_classifier.store(file_name=INCREMENTAL_CLASSIFIER)
+        return True
+
+    @staticmethod
+    def is_pending() -> bool:
+        # an updated best classifier is waiting for the test report evaluation
+        return os.path.exists(os.path.join(os.path.abspath('..'), 'data', INCREMENTAL_CLASSIFIER))
+
+    @staticmethod
+    def accept_update() -> None:
+        data_path = os.path.join(os.path.abspath('..'), 'data')
+        os.replace(os.path.join(data_path, INCREMENTAL_CLASSIFIER), os.path.join(data_path, 'best_classifier.sav'))
+
+    @staticmethod
+    def discard_update() -> None:
+        path = os.path.join(os.path.abspath('..'), 'data', INCREMENTAL_CLASSIFIER)
+        if os.path.exists(path):
+            os.remove(path)
@@ -1,9 +1,11 @@
+import io
 import queue
 from threading import Thread
 
 from flask import Flask, request
 from requests import post, exceptions
 import logging
+import numpy as np
 
 from utility.logging import trace, success, error, info
 
@@ -70,3 +72,21 @@ def post_json():
     receive_thread.start()
 
     return {}, 200
+
+
+@app.post('/dataset')
+def post_dataset():
+    # compressed columnar dataset: the npz arrays are decoded directly, without building a JSON document
+    try:
+        with np.load(io.BytesIO(request.get_data()), allow_pickle=False) as columns:
+            received_dataset = {name: {'features': columns[f'{name}_features'],
+                                       'environments': columns[f'{name}_environments'],
+                                       'command_thoughts': columns[f'{name}_command_thoughts']}
+                                for name in ['training', 'validation', 'testing']}
+    except (OSError, ValueError, KeyError):
+        return {'error': 'Invalid columnar dataset'}, 500
+
+    receive_thread = Thread(target=JsonIO.get_instance().receive, args=(received_dataset,))
+    receive_thread.start()
+
+    return {}, 200
@@ -1,8 +1,11 @@
+import hashlib
 import json
 import os
+import shutil
 import sqlite3
 import uuid
 
+import numpy as np
 from jsonschema import validate, ValidationError
 
 from utility.logging import error, trace, success, warning
@@ -15,6 +18,12 @@ LABEL_TO_INT = {
     'right': 3
 }
 
+# tables of the three sets
+SET_TABLES = ['training_set', 'validation_set', 'test_set']
+
+# order of the bands in the feature columns
+BANDS = ['alpha', 'beta', 'delta', 'theta']
+
 # environment to integer conversion
 ENVIRONMENT_TO_INT = {
     'indoor': 0,
@@ -25,6 +34,8 @@ ENVIRONMENT_TO_INT = {
 class LearningSessionStore:
 
     def __init__(self) -> None:
+        # arrays of the loaded sets
+        self._cache = {}
         self._conn = sqlite3.connect(os.path.join(os.path.abspath('..'), 'data', 'learning_session_store.db'))
 
         if self._conn is not None and self._create_table():
@@ -57,11 +68,15 @@ class LearningSessionStore:
             query += ');'
 
             # create the three tables
-            for table_name in ['training_set', 'validation_set', 'test_set']:
+            for table_name in SET_TABLES:
                 new_query = 'CREATE TABLE IF NOT EXISTS ' + table_name + query
                 self._conn.cursor().execute(new_query)
                 self._conn.commit()
 
+            # content hash of the stored dataset, it names the directory of its snapshot
+            self._conn.cursor().execute('CREATE TABLE IF NOT EXISTS dataset_snapshot (HASH TEXT);')
+            self._conn.commit()
+
         except sqlite3.Error:
             error('Failed to create table')
             return False
@@ -81,6 +96,10 @@ class LearningSessionStore:
         return True
 
     def store_dataset(self, received_dataset: dict) -> bool:
+        # the dataset received in the columnar format contains the arrays of each set
+        if isinstance(received_dataset.get('training'), dict):
+            return self._store_columnar_dataset(received_dataset)
+
         # open schema
         with open(os.path.join(os.path.abspath('..'), 'resources', 'received_dataset_schema.json')) as f:
             received_dataset_schema = json.load(f)
@@ -92,52 +111,61 @@ class LearningSessionStore:
             warning('Received Dataset validation failed')
             return False
 
-        # convert training set to a list of tuple
-        training = []
-        for session in received_dataset['training']:
-            session = [str(uuid.uuid4())] + session['features']['alpha'] + session['features']['beta'] + \
-                      session['features']['delta'] + session['features']['theta'] + \
-                      [ENVIRONMENT_TO_INT[session['features']['environment']],
-                       LABEL_TO_INT[session['command_thought']]]
-            training.append(tuple(session))
-
-        # convert validation set to a list of tuple
-        validation = []
-        for session in received_dataset['validation']:
-            session = [str(uuid.uuid4())] + session['features']['alpha'] + session['features']['beta'] + \
-                      session['features']['delta'] + session['features']['theta'] + \
-                      [ENVIRONMENT_TO_INT[session['features']['environment']],
-                       LABEL_TO_INT[session['command_thought']]]
-            validation.append(tuple(session))
-
-        # convert test set to a list of tuple
-        test = []
-        for session in received_dataset['testing']:
-            session = [str(uuid.uuid4())] + session['features']['alpha'] + session['features']['beta'] + \
-                      session['features']['delta'] + session['features']['theta'] + \
-                      [ENVIRONMENT_TO_INT[session['features']['environment']],
-                       LABEL_TO_INT[session['command_thought']]]
-            test.append(tuple(session))
-
-        # insert the three datasets in the database
-        res_training = self._insert_dataset(training, 'training_set')
-        res_validation = self._insert_dataset(validation, 'validation_set')
-        res_test = self._insert_dataset(test, 'test_set')
-
-        if res_training and res_validation and res_test:
-            return True
-        return False
+        # convert the sessions of the three sets to columns and store them
+        columnar_dataset = {}
+        for set_name in ['training', 'validation', 'testing']:
+            sessions = received_dataset[set_name]
+            columnar_dataset[set_name] = {
+                'features': np.array([[session['features'][band] for band in BANDS] for session in sessions],
+                                     dtype=np.float64).reshape(-1, len(BANDS), 22),
+                'environments': np.array([session['features']['environment'] for session in sessions]),
+                'command_thoughts': np.array([session['command_thought'] for session in sessions])
+            }
+        return self._store_columnar_dataset(columnar_dataset)
+
+    def _store_columnar_dataset(self, received_dataset: dict) -> bool:
+        tables = {'training': 'training_set', 'validation': 'validation_set', 'testing': 'test_set'}
+        datasets = {}
+        for set_name, table_name in tables.items():
+            columns = received_dataset[set_name]
+            sessions = len(columns['command_thoughts'])
+
+            # validate the shape of the features and the values of the categorical columns
+            if columns['features'].shape != (sessions, 4, 22) or len(columns['environments']) != sessions or \
+                    not np.isin(columns['environments'], list(ENVIRONMENT_TO_INT)).all() or \
+                    not np.isin(columns['command_thoughts'], list(LABEL_TO_INT)).all():
+                warning('Received Dataset validation failed')
+                return False
+
+            # the features are already in the (alpha, beta, delta, theta) order of the table columns
+            features = columns['features'].reshape(sessions, -1).tolist()
+            environments = [ENVIRONMENT_TO_INT[environment] for environment in columns['environments']]
+            labels = [LABEL_TO_INT[command_thought] for command_thought in columns['command_thoughts']]
+            datasets[table_name] = [tuple([str(uuid.uuid4())] + session + [environment, label])
+                                    for session, environment, label in zip(features, environments, labels)]
+
+        # insert the three datasets in the database and materialize their snapshot
+        self._cache.clear()
+        results = [self._insert_dataset(dataset, table_name) for table_name, dataset in datasets.items()]
+        return all(results) and self._create_snapshot() is not None
 
     def delete_dataset(self) -> bool:
+        snapshot_path = self._get_snapshot_path()
         try:
             # empty the three tables
-            for table_name in ['training_set', 'validation_set', 'test_set']:
+            for table_name in SET_TABLES + ['dataset_snapshot']:
                 query = 'DELETE FROM ' + table_name
                 self._conn.cursor().execute(query)
                 self._conn.commit()
         except sqlite3.Error:
             error('Failed to empy dataset')
             return False
+        finally:
+            self._cache.clear()
+
+        # remove the snapshot of the dataset
+        if snapshot_path is not None:
+            shutil.rmtree(snapshot_path, ignore_errors=True)
 
         trace(f'The dataset has been removed from DB')
         return True
@@ -154,31 +182,88 @@ class LearningSessionStore:
         dataset = self._get_dataset('test_set')
         return {'test_data': dataset[0], 'test_labels': dataset[1]}
 
-    def _get_dataset(self, dataset_name: str) -> list:
+    def get_dataset_hash(self) -> str:
+        # content hash of the stored dataset (None if there isn't)
+        try:
+            res = self._conn.cursor().execute('SELECT HASH FROM dataset_snapshot').fetchone()
+        except sqlite3.Error:
+            return None
+        return None if res is None else res[0]
+
+    def _get_dataset(self, dataset_name: str) -> tuple:
+        # the sets are read-only memory mapped views of the snapshot of the dataset, they are cached
+        # until the dataset is deleted
+        if dataset_name in self._cache:
+            return self._cache[dataset_name]
+
+        # the snapshot is created from the database if it doesn't exist (dataset stored by a previous version)
+        snapshot_path = self._get_snapshot_path()
+        if snapshot_path is None:
+            snapshot_path = self._create_snapshot()
+            if snapshot_path is None:
+                return None
+
+        for table_name in SET_TABLES:
+            self._cache[table_name] = (np.load(os.path.join(snapshot_path, f'{table_name}_data.npy'), mmap_mode='r'),
+                                       np.load(os.path.join(snapshot_path, f'{table_name}_labels.npy'), mmap_mode='r'))
+        return self._cache[dataset_name]
+
+    def _get_snapshot_path(self) -> str:
+        dataset_hash = self.get_dataset_hash()
+        if dataset_hash is None:
+            return None
+        snapshot_path = os.path.join(os.path.abspath('..'), 'data', 'snapshots', dataset_hash)
+        return snapshot_path if os.path.isdir(snapshot_path) else None
+
+    def _create_snapshot(self) -> str:
+        # decode the three sets from the database once
+        arrays = {}
+        for table_name in SET_TABLES:
+            dataset = self._read_dataset(table_name)
+            if dataset is None:
+                return None
+            arrays[f'{table_name}_data'], arrays[f'{table_name}_labels'] = dataset
+
+        # the snapshot directory is named after the content hash of the dataset
+        dataset_hash = hashlib.sha256()
+        for name, array in arrays.items():
+            dataset_hash.update(name.encode())
+            dataset_hash.update(array.tobytes())
+        dataset_hash = dataset_hash.hexdigest()[:16]
+        snapshot_path = os.path.join(os.path.abspath('..'), 'data', 'snapshots', dataset_hash)
+
         try:
-            results = []
+            os.makedirs(snapshot_path, exist_ok=True)
+            for name, array in arrays.items():
+                np.save(os.path.join(snapshot_path, f'{name}.npy'), array)
+            self._conn.cursor().execute('DELETE FROM dataset_snapshot')
+            self._conn.cursor().execute('INSERT INTO dataset_snapshot VALUES (?)', (dataset_hash,))
+            self._conn.commit()
+        except (OSError, sqlite3.Error):
+            error('Failed to create the dataset snapshot')
+            return None
 
-            # generate all column names
-            channels = ['ALPHA', 'BETA', 'DELTA', 'THETA']
-            column_names = []
-            for channel in channels:
-                for i in range(22):
-                    column_names.append(f'{channel}_{i}')
-            column_names.append('ENVIRONMENT')
+        trace(f'Dataset snapshot {dataset_hash} created')
+        return snapshot_path
 
-            cursor = self._conn.cursor()
+    def _read_dataset(self, dataset_name: str) -> tuple:
+        # generate all column names (features, environment and label)
+        channels = ['ALPHA', 'BETA', 'DELTA', 'THETA']
+        column_names = []
+        for channel in channels:
+            for i in range(22):
+                column_names.append(f'{channel}_{i}')
+        column_names.append('ENVIRONMENT')
+        column_names.append('LABEL')
 
-            # get the features
+        try:
+            # get features and labels of the same rows with a single query
             query = f'SELECT {", ".join(column_names)} FROM {dataset_name}'
-            cursor.execute(query)
-            results.append(cursor.fetchall())
-
-            # get the labels
-            query = f'SELECT LABEL FROM {dataset_name}'
-            cursor.execute(query)
-            results.append(cursor.fetchall())
+            rows = self._conn.cursor().execute(query).fetchall()
         except sqlite3.Error:
             error(f'Failed to get datset from DB')
             return None
 
-        return results
+        # float32 matrix of the features (with the environment) and int vector of the labels
+        table = np.array(rows, dtype=np.float32).reshape(len(rows), len(column_names))
+        return np.ascontiguousarray(table[:, :-1]), table[:, -1].astype(np.int64)
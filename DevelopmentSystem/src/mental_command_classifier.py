@@ -2,6 +2,8 @@ import os.path
 import pickle
 import warnings
 import joblib
+import numpy as np
+from sklearn.metrics import log_loss
 from sklearn.neural_network import MLPClassifier
 from sklearn.exceptions import ConvergenceWarning, DataConversionWarning
 
@@ -15,8 +17,7 @@ class MentalCommandClassifier:
             if training_parameters is None:
                 self._classifier = None
             else:
-                self._classifier = MLPClassifier(max_iter=training_parameters['number_of_generations'],
-                                                 hidden_layer_sizes=training_parameters['hidden_layer_sizes'])
+                self._classifier = self._build_classifier(training_parameters)
 
         # file_name is given load it from disk
         else:
@@ -29,9 +30,34 @@ class MentalCommandClassifier:
     def train_classifier(self, training_data: list, training_labels: list) -> None:
         self._classifier.fit(training_data, training_labels)
 
+    def continue_training(self, trained_classifier: MLPClassifier, training_data: list,
+                          training_labels: list) -> None:
+        # continue the training of a classifier trained with fewer generations up to the number of generations
+        number_of_generations = self.get_number_of_generations()
+        self._classifier = trained_classifier
+        self._classifier.set_params(warm_start=True,
+                                    max_iter=number_of_generations - trained_classifier.get_params()['max_iter'])
+        self._classifier.fit(training_data, training_labels)
+        self._classifier.set_params(warm_start=False, max_iter=number_of_generations)
+
+    def train_generation(self, training_data: list, training_labels: list) -> None:
+        # a single generation (epoch) continuing from the previous ones, the optimizer state is kept.
+        # The classes are fixed by the first training (the new labels may not contain all of them)
+        classes = None if hasattr(self._classifier, 'classes_') else np.unique(training_labels)
+        self._classifier.partial_fit(training_data, training_labels, classes=classes)
+
+    def get_classifier(self) -> MLPClassifier:
+        return self._classifier
+
+    def set_classifier(self, classifier: MLPClassifier) -> None:
+        self._classifier = classifier
+
     def get_error(self, data: list, label: list) -> float:
         return self._classifier.score(data, label)
 
+    def get_loss(self, data: list, label: list) -> float:
+        return log_loss(label, self._classifier.predict_proba(data), labels=self._classifier.classes_)
+
     def get_losses(self) -> list:
         return self._classifier.loss_curve_
 
@@ -54,8 +80,10 @@ class MentalCommandClassifier:
         file_path = os.path.join(os.path.abspath('..'), 'data', file_name)
         self._classifier = joblib.load(file_path)
 
-    def store(self) -> None:
-        file_path = os.path.join(os.path.abspath('..'), 'data', f'{self._uuid}.sav')
+    def store(self, file_name: str = None) -> None:
+        if file_name is None:
+            file_name = f'{self._uuid}.sav'
+        file_path = os.path.join(os.path.abspath('..'), 'data', file_name)
         joblib.dump(self._classifier, file_path)
 
     def rebuild(self, training_parameters: dict, uuid: int = None) -> None:
@@ -63,7 +91,14 @@ class MentalCommandClassifier:
             self._uuid += 1                              # autoincrement useful during the grid search
         else:
             self._uuid = uuid
-        self._classifier = MLPClassifier(training_parameters)
+        self._classifier = self._build_classifier(training_parameters)
+
+    @staticmethod
+    def _build_classifier(training_parameters: dict) -> MLPClassifier:
+        # the seed (if any) makes the weights initialization and the batches shuffling deterministic
+        return MLPClassifier(max_iter=training_parameters['number_of_generations'],
+                             hidden_layer_sizes=training_parameters['hidden_layer_sizes'],
+                             random_state=training_parameters.get('seed'))
 
     def serialize(self) -> dict:
         # convert to string and insert in a dictionary
@@ -1,49 +1,61 @@
+import heapq
 import os
 from src.mental_command_classifier import MentalCommandClassifier
-from utility.logging import error
 
 
 class TopFiveClassifierEvaluators:
 
-    def __init__(self, dataset: dict) -> None:
+    def __init__(self, dataset: dict, number_of_classifiers: int = 5) -> None:
+        # min-heap of (validation_error, -uuid, training_error, classifier): the root is the worst of the top
+        # classifiers (with the same validation error the most recent one is the worst)
         self._top_five_classifiers = []
+        self._number_of_classifiers = number_of_classifiers
         self._dataset = dataset
+        # uuids of the classifiers saved on disk
+        self._stored_uuids = set()
 
-    def evaluate_new_classifier(self, new_classifier: MentalCommandClassifier) -> None:
-        # compute validation error
-        validation_error = new_classifier.get_error(self._dataset['validation_data'],
-                                                    self._dataset['validation_labels'])
+    def evaluate_new_classifier(self, new_classifier: MentalCommandClassifier, training_error: float = None,
+                                validation_error: float = None) -> None:
+        # compute the errors if they haven't been computed after the training
+        if validation_error is None:
+            validation_error = new_classifier.get_error(self._dataset['validation_data'],
+                                                        self._dataset['validation_labels'])
+        if training_error is None:
+            training_error = new_classifier.get_error(self._dataset['training_data'],
+                                                      self._dataset['training_labels'])
 
-        # add new classifier with validation error in the list, orded by descending validation_error
-        self._top_five_classifiers.append({'uuid': new_classifier.get_uuid(), 'validation_error': validation_error})
-        self._top_five_classifiers = sorted(self._top_five_classifiers, key=lambda x: x["validation_error"],
-                                            reverse=True)
+        # the classifiers are kept in memory, the new classifier replaces the worst one if it's better
+        entry = (validation_error, -new_classifier.get_uuid(), training_error, new_classifier)
+        if len(self._top_five_classifiers) < self._number_of_classifiers:
+            heapq.heappush(self._top_five_classifiers, entry)
+        elif entry[:2] > self._top_five_classifiers[0][:2]:
+            heapq.heapreplace(self._top_five_classifiers, entry)
 
-        if len(self._top_five_classifiers) > 5:
+    def restore_classifier(self, classifier_uuid: int, training_error: float, validation_error: float) -> None:
+        # reload from disk a top classifier of an interrupted grid search
+        self.evaluate_new_classifier(MentalCommandClassifier(file_name=f'{classifier_uuid}.sav'),
+                                     training_error=training_error, validation_error=validation_error)
+        self._stored_uuids.add(classifier_uuid)
 
-            # if the new classifier is one of the top five remove from list and disk the sixth
-            if self._top_five_classifiers[5]['uuid'] != new_classifier.get_uuid():
-                # save classifier to disk
-                new_classifier.store()
+    def store_top_classifiers(self) -> list:
+        # save to disk the top classifiers not saved yet, at the end of the grid search (or at the checkpoints)
+        top_classifiers = []
+        for validation_error, negative_uuid, training_error, classifier in self._top_five_classifiers:
+            if -negative_uuid not in self._stored_uuids:
+                classifier.store()
+                self._stored_uuids.add(-negative_uuid)
+            top_classifiers.append([-negative_uuid, training_error, validation_error])
+        return top_classifiers
 
-                # remove the sexth from disk
-                try:
-                    uuid_to_remove = self._top_five_classifiers[5]['uuid']
-                    os.remove(os.path.join(os.path.abspath('..'), 'data', f'{uuid_to_remove}.sav'))
-                except FileNotFoundError:
-                    error('Serialized Classifier not found')
-                    exit(1)
-
-                # remove the sixth from the list
-                self._top_five_classifiers = self._top_five_classifiers[:5]
-
-            # if the new classifier isn't one of the top five remove it from list
-            else:
-                self._top_five_classifiers = self._top_five_classifiers[:5]
-
-        else:
-            # save classifier to disk
-            new_classifier.store()
+    def remove_evicted_classifiers(self) -> None:
+        # remove from disk the saved classifiers that aren't in the top classifiers anymore
+        top_uuids = {-negative_uuid for _, negative_uuid, _, _ in self._top_five_classifiers}
+        for classifier_uuid in self._stored_uuids - top_uuids:
+            try:
+                os.remove(os.path.join(os.path.abspath('..'), 'data', f'{classifier_uuid}.sav'))
+            except FileNotFoundError:
+                pass
+        self._stored_uuids &= top_uuids
 
     def get_top_classifiers(self, number_of_generations: int, validation_error_threshold: float) -> dict:
         # structure of the report
@@ -53,19 +65,16 @@ class TopFiveClassifierEvaluators:
             'classifiers': []
         }
 
-        # iterate the top five classifier
-        for classifier in self._top_five_classifiers:
-            # reload the classifier from disk
-            classifier_name = f'{classifier["uuid"]}.sav'
-            mental_command_classifier = MentalCommandClassifier(file_name=classifier_name)
-
+        # iterate the top five classifier ordered by descending validation error, the report is built
+        # from the classifiers in memory and the errors computed after their training
+        for validation_error, negative_uuid, training_error, mental_command_classifier in \
+                sorted(self._top_five_classifiers, key=lambda entry: entry[:2], reverse=True):
             # insert the classifier in the report
             info_classifier = {
-                'uuid': classifier["uuid"],
+                'uuid': -negative_uuid,
                 'hidden_layer_sizes': mental_command_classifier.get_hidden_layer_sizes(),
-                'training_error': mental_command_classifier.get_error(self._dataset['training_data'],
-                                                                      self._dataset['training_labels']),
-                'validation_error': classifier['validation_error'],
+                'training_error': training_error,
+                'validation_error': validation_error,
                 'actual_best': False
             }
             top_five_classifiers['classifiers'].append(info_classifier)
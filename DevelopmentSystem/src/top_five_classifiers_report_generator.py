@@ -14,7 +14,7 @@ class TopFiveClassifiersReportGenerator:
 
     def generate_report(self, top_five_classifiers: dict, testing: bool) -> None:
         # if testing mode randomically generate the answers (there is one actual_best with the 80% of probability)
-        if testing is True:
+        if testing is True and len(top_five_classifiers['classifiers']) > 0:
             if random() < 0.8:
                 # randomically select the actual best
                 best = choice(top_five_classifiers['classifiers'])
@@ -1,46 +1,99 @@
 import json
+import math
 import os
 from typing import Any
 
 from jsonschema import validate, ValidationError
 
+from src.grid_search_checkpoint import GridSearchCheckpoint
+from src.grid_search_executor import GridSearchExecutor
+from src.grid_search_result_cache import GridSearchResultCache
 from src.mental_command_classifier import MentalCommandClassifier
 from src.top_five_classifiers_evaluator import TopFiveClassifierEvaluators
 from src.top_five_classifiers_report_generator import TopFiveClassifiersReportGenerator
-from utility.logging import info, trace, error
+from utility.logging import info, error
 
 
 class ValidationController:
 
     def __init__(self, mental_command_classifier: MentalCommandClassifier = None,
-                 number_of_hidden_layers_range: list = None, number_of_hidden_neurons_range: list = None) -> None:
+                 number_of_hidden_layers_range: list = None, number_of_hidden_neurons_range: list = None,
+                 number_of_workers: int = None, seed: int = None, search_mode: str = 'grid',
+                 halving_factor: int = 3, checkpoint_interval: int = 10, dataset_hash: str = None,
+                 result_cache: dict = None) -> None:
         self._mental_command_classifier = mental_command_classifier
         self._number_of_hidden_layers_range = number_of_hidden_layers_range
         self._number_of_hidden_neurons_range = number_of_hidden_neurons_range
+        self._number_of_workers = number_of_workers
+        self._seed = seed
+        self._search_mode = search_mode
+        self._halving_factor = halving_factor
+        self._checkpoint_interval = checkpoint_interval
+        self._dataset_hash = dataset_hash
+        self._result_cache = result_cache or {}
 
     def run(self, operational_mode: str, testing: bool = False, dataset: dict = None,
             validation_error_threshold: float = None) -> int:
         if operational_mode == 'grid_search':
             top_five_classifiers_evaluator = TopFiveClassifierEvaluators(dataset)
-            self._mental_command_classifier = MentalCommandClassifier()
 
             # prepare the combinations of parameters
             number_of_generations, training_parameters_combinations = self._generate_training_parameters_combinations()
             number_of_combinations = len(training_parameters_combinations)
             info(f'Grid Search with {number_of_combinations} combinations of parameters')
-            counter = 0
 
-            # grid search
-            for parameters in training_parameters_combinations:
-                # create and train a classifier with the new parameters
-                self._mental_command_classifier.rebuild(parameters)
-                self._mental_command_classifier.train_classifier(dataset['training_data'], dataset['training_labels'])
-
-                # evaluate if is one of the top five
-                top_five_classifiers_evaluator.evaluate_new_classifier(new_classifier=self._mental_command_classifier)
-
-                counter += 1
-                trace(f'{round((counter / number_of_combinations) * 100)}% of Grid Search completed')
+            # the search resumes from the checkpoint of the same search interrupted by a crash
+            checkpoint = GridSearchCheckpoint(search={
+                'dataset_hash': self._dataset_hash, 'number_of_generations': number_of_generations,
+                'combinations': training_parameters_combinations, 'seed': self._seed,
+                'search_mode': self._search_mode, 'halving_factor': self._halving_factor},
+                interval=self._checkpoint_interval)
+            if checkpoint.load():
+                try:
+                    for classifier_uuid, training_error, validation_error in checkpoint.get_top_classifiers():
+                        top_five_classifiers_evaluator.restore_classifier(classifier_uuid, training_error,
+                                                                          validation_error)
+                except FileNotFoundError:
+                    error('Serialized Classifier of the checkpoint not found, restart the Grid Search')
+                    checkpoint.reset()
+                    top_five_classifiers_evaluator = TopFiveClassifierEvaluators(dataset)
+
+            # the candidates are trained in parallel and each trained classifier is evaluated (in the order of
+            # the combinations) to check if is one of the top five
+            candidates = [(uuid, {'number_of_generations': number_of_generations,
+                                  'hidden_layer_sizes': hidden_layer_sizes, 'seed': self._seed})
+                          for uuid, hidden_layer_sizes in enumerate(training_parameters_combinations, 1)]
+            executor = GridSearchExecutor(number_of_workers=self._number_of_workers)
+
+            # the candidates already trained on the same dataset (in a previous search) are reused
+            result_cache = None
+            if self._result_cache.get('enabled', False) and self._dataset_hash is not None:
+                result_cache = GridSearchResultCache(self._dataset_hash,
+                                                     store_models=self._result_cache.get('store_models', False),
+                                                     warm_start=self._result_cache.get('warm_start', False),
+                                                     prune_other_datasets=self._result_cache.get(
+                                                         'prune_other_datasets', False))
+
+            if self._search_mode == 'successive_halving':
+                candidates = self._successive_halving(executor, candidates, dataset, checkpoint,
+                                                      top_five_classifiers_evaluator, result_cache)
+
+            def evaluate_new_classifier(classifier_uuid: int, classifier: MentalCommandClassifier,
+                                        training_error: float, validation_error: float) -> None:
+                top_five_classifiers_evaluator.evaluate_new_classifier(classifier, training_error, validation_error)
+                if checkpoint.add_result(0, classifier_uuid, training_error, validation_error):
+                    self._save_checkpoint(checkpoint, top_five_classifiers_evaluator)
+
+            candidates = [candidate for candidate in candidates if checkpoint.get_result(0, candidate[0]) is None]
+            if result_cache is not None:
+                candidates = self._skip_cached_candidates(candidates, checkpoint, result_cache)
+            executor.run(candidates=candidates, dataset=dataset, on_result=evaluate_new_classifier,
+                         result_cache=result_cache)
+            top_five_classifiers_evaluator.store_top_classifiers()
+            top_five_classifiers_evaluator.remove_evicted_classifiers()
+            checkpoint.remove()
+            if result_cache is not None:
+                result_cache.flush()
 
             # generate the report
             TopFiveClassifiersReportGenerator().generate_report(
@@ -52,6 +105,77 @@ class ValidationController:
         elif operational_mode == 'check_top_five_classifiers_report':
             return TopFiveClassifiersReportGenerator().evaluate_report()
 
+    @staticmethod
+    def _save_checkpoint(checkpoint: GridSearchCheckpoint,
+                         top_five_classifiers_evaluator: TopFiveClassifierEvaluators) -> None:
+        # the evicted classifiers are removed only when the checkpoint doesn't refer to them anymore
+        checkpoint.save(top_five_classifiers_evaluator.store_top_classifiers())
+        top_five_classifiers_evaluator.remove_evicted_classifiers()
+
+    @staticmethod
+    def _skip_cached_candidates(candidates: list, checkpoint: GridSearchCheckpoint,
+                                result_cache: GridSearchResultCache) -> list:
+        # the candidates with a cached validation error (but without the model, stored only if requested) are
+        # trained again only if they can be in the top five: a candidate with at least five known results better
+        # than its one (with the same validation error the first one) can't be, whatever the other candidates
+        ranks = {}
+        for uuid, training_parameters in candidates:
+            if result_cache.is_cacheable(training_parameters):
+                cached_result = result_cache.get(training_parameters, need_model=False)
+                if cached_result is not None:
+                    ranks[uuid] = (cached_result[2], -uuid)
+        # the top classifiers of the checkpoint are known results too
+        known_ranks = sorted(list(ranks.values()) + [(validation_error, -uuid) for uuid, _, validation_error
+                                                     in checkpoint.get_top_classifiers()], reverse=True)
+        skipped = {uuid for uuid, rank in ranks.items() if len(known_ranks) > 5 and rank < known_ranks[4]}
+        if len(skipped) > 0:
+            info(f'{len(skipped)} cached candidates skipped, they can\'t be in the top five')
+        return [candidate for candidate in candidates if candidate[0] not in skipped]
+
+    def _successive_halving(self, executor: GridSearchExecutor, candidates: list, dataset: dict,
+                            checkpoint: GridSearchCheckpoint,
+                            top_five_classifiers_evaluator: TopFiveClassifierEvaluators,
+                            result_cache: GridSearchResultCache) -> list:
+        # the candidates are trained with a small number of generations and only the best 1/halving_factor
+        # survive to the next round, trained with halving_factor times the generations. The rounds stop
+        # when the survivors are at least five, the survivors are then trained with all the generations
+        number_of_generations = candidates[0][1]['number_of_generations']
+        number_of_rounds = 0
+        while math.ceil(len(candidates) / self._halving_factor ** number_of_rounds) > 5:
+            number_of_rounds += 1
+
+        for round_number in range(number_of_rounds):
+            budget = max(1, round(number_of_generations / self._halving_factor ** (number_of_rounds - round_number)))
+            info(f'Successive Halving round {round_number + 1}/{number_of_rounds}: '
+                 f'{len(candidates)} candidates with {budget} generations')
+
+            # the candidates already trained in this round before a crash aren't trained again
+            validation_errors = {}
+            for uuid, _ in candidates:
+                result = checkpoint.get_result(round_number + 1, uuid)
+                if result is not None:
+                    validation_errors[uuid] = result[1]
+
+            def save_validation_error(classifier_uuid: int, classifier: MentalCommandClassifier,
+                                      training_error: float, validation_error: float) -> None:
+                validation_errors[classifier_uuid] = validation_error
+                if checkpoint.add_result(round_number + 1, classifier_uuid, training_error, validation_error):
+                    self._save_checkpoint(checkpoint, top_five_classifiers_evaluator)
+
+            # only the validation errors are needed to select the survivors
+            executor.run(candidates=[(uuid, training_parameters | {'number_of_generations': budget})
+                                     for uuid, training_parameters in candidates if uuid not in validation_errors],
+                         dataset=dataset, on_result=save_validation_error, result_cache=result_cache,
+                         need_models=False)
+
+            # keep the best candidates (with the same validation error the first one)
+            survivors = max(5, math.ceil(len(candidates) / self._halving_factor))
+            candidates = sorted(candidates, key=lambda candidate: validation_errors[candidate[0]],
+                                reverse=True)[:survivors]
+            candidates = sorted(candidates, key=lambda candidate: candidate[0])
+
+        return candidates
+
     def _generate_training_parameters_combinations(self) -> tuple[Any, list[tuple[int, ...]]]:
         # load number of generations file and schema
         with open(os.path.join(os.path.abspath('..'), 'data', 'number_of_generations.json')) as f:
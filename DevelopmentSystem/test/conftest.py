@@ -0,0 +1,33 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+# manual scripts run by hand against a running Development System (not pytest tests)
+collect_ignore = ['test_database.py', 'test_receive_classifier.py', 'test_send_columnar_dataset.py',
+                  'test_send_dataset.py']
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    # the system runs from its 'src' folder, with the data and the resources in the parent folder
+    os.mkdir(tmp_path / 'src')
+    os.mkdir(tmp_path / 'data')
+    shutil.copytree(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'resources'),
+                    tmp_path / 'resources')
+    monkeypatch.chdir(tmp_path / 'src')
+    return tmp_path
+
+
+@pytest.fixture
+def dataset():
+    # separable learning sets with the shape of the stored ones (89 features, 3 command thoughts)
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(600, 89)).astype(np.float32)
+    labels = (data[:, 0] + data[:, 1] > 0).astype(np.int64) + (data[:, 2] > 1)
+    return {
+        'training_data': data[:300], 'training_labels': labels[:300],
+        'validation_data': data[300:450], 'validation_labels': labels[300:450],
+        'test_data': data[450:], 'test_labels': labels[450:]
+    }
@@ -0,0 +1,63 @@
+import json
+
+from src.early_training_controller import EarlyTrainingController
+
+EARLY_STOPPING = {'enabled': True, 'patience': 5, 'min_delta': 0.001, 'max_generations': 100}
+
+
+def run_early_training(workspace, dataset, number_of_generations, early_stopping=None):
+    with open(workspace / 'data' / 'number_of_generations.json', 'w') as f:
+        json.dump({'number_of_generations': number_of_generations}, f)
+    controller = EarlyTrainingController(number_of_hidden_layers_range=[1, 3],
+                                         number_of_hidden_neurons_range=[1, 16], seed=0,
+                                         early_stopping=early_stopping)
+    controller.run(operational_mode='early_training', training_dataset=dataset, validation_dataset=dataset)
+    with open(workspace / 'data' / 'early_training_report.json') as f:
+        report = json.load(f)
+    with open(workspace / 'data' / 'number_of_generations.json') as f:
+        suggestion = json.load(f)['number_of_generations']
+    return controller.mental_command_classifier, report, suggestion
+
+
+def test_early_stopping(workspace, dataset):
+    classifier, report, suggestion = run_early_training(workspace, dataset, 10, EARLY_STOPPING)
+
+    # the suggestion isn't limited by the number of generations and the report describes the restored classifier
+    assert 10 < suggestion < EARLY_STOPPING['max_generations']
+    assert report['number_of_generations'] == suggestion == len(classifier.get_losses())
+    assert report['training_error'] == classifier.get_error(dataset['training_data'], dataset['training_labels'])
+    with open(workspace / 'data' / 'early_training_state.json') as f:
+        assert len(json.load(f)['validation_losses']) == suggestion
+
+    # the next early training continues the restored classifier and finds the same plateau
+    continued, report, _ = run_early_training(workspace, dataset, suggestion, EARLY_STOPPING)
+    assert report['number_of_generations'] == suggestion
+    assert continued.get_losses() == classifier.get_losses()
+
+
+def test_edited_number_of_generations(workspace, dataset):
+    _, _, suggestion = run_early_training(workspace, dataset, 10, EARLY_STOPPING)
+
+    # the number of generations changed by the ML Engineer is the maximum instead of max_generations
+    edited = suggestion // 2
+    classifier, report, new_suggestion = run_early_training(workspace, dataset, edited, EARLY_STOPPING)
+    assert new_suggestion <= edited
+    assert report['number_of_generations'] == new_suggestion == len(classifier.get_losses())
+    with open(workspace / 'data' / 'early_training_state.json') as f:
+        assert json.load(f)['suggested_number_of_generations'] == new_suggestion
+
+
+def test_continue_fixed_generations(workspace, dataset):
+    classifier, report, _ = run_early_training(workspace, dataset, 5)
+    assert report['number_of_generations'] == len(classifier.get_losses()) == 5
+
+    # the previous classifier is trained for the missing generations only
+    continued, report, _ = run_early_training(workspace, dataset, 8)
+    assert len(continued.get_losses()) == 8
+    assert continued.get_losses()[:5] == classifier.get_losses()
+
+    # fewer generations than the trained ones need a new classifier
+    EarlyTrainingController.remove_early_training()
+    assert not (workspace / 'data' / 'early_training_classifier.sav').exists()
+    restarted, _, _ = run_early_training(workspace, dataset, 5)
+    assert restarted.get_losses() == classifier.get_losses()
@@ -0,0 +1,50 @@
+import json
+
+from src.grid_search_checkpoint import GridSearchCheckpoint
+
+SEARCH = {'dataset_hash': 'abc', 'number_of_generations': 9, 'combinations': [[4], [8, 4]], 'seed': 0,
+          'search_mode': 'successive_halving', 'halving_factor': 3}
+
+
+def test_resume(workspace):
+    checkpoint = GridSearchCheckpoint(SEARCH, interval=2)
+    assert not checkpoint.load()
+    assert not checkpoint.add_result(1, 1, 0.5, 0.4)
+    assert checkpoint.add_result(0, 1, 0.7, 0.6)
+    checkpoint.save([[1, 0.7, 0.6]])
+
+    resumed = GridSearchCheckpoint(SEARCH, interval=2)
+    assert resumed.load()
+    assert resumed.get_result(1, 1) == [0.5, 0.4]
+    assert resumed.get_result(0, 1) == [0.7, 0.6]
+    assert resumed.get_result(0, 2) is None
+    assert resumed.get_top_classifiers() == [[1, 0.7, 0.6]]
+
+    resumed.remove()
+    assert not GridSearchCheckpoint(SEARCH).load()
+
+
+def test_rounds_are_separate(workspace):
+    # a halving round with the same generations of the final training doesn't complete the final training
+    checkpoint = GridSearchCheckpoint(SEARCH)
+    checkpoint.add_result(1, 3, 0.5, 0.4)
+    assert checkpoint.get_result(0, 3) is None
+
+
+def test_other_search_not_resumed(workspace):
+    checkpoint = GridSearchCheckpoint(SEARCH)
+    checkpoint.add_result(0, 1, 0.7, 0.6)
+    checkpoint.save([])
+    assert not GridSearchCheckpoint(SEARCH | {'dataset_hash': 'def'}).load()
+
+    # checkpoints of the old format (results keyed by generations) aren't resumed
+    with open(workspace / 'data' / 'grid_search_checkpoint.json', 'w') as f:
+        json.dump({'search': SEARCH, 'results': {'9:1': [0.7, 0.6]}, 'top_classifiers': []}, f)
+    assert not GridSearchCheckpoint(SEARCH).load()
+
+
+def test_disabled(workspace):
+    checkpoint = GridSearchCheckpoint(SEARCH, interval=0)
+    assert not checkpoint.add_result(0, 1, 0.7, 0.6)
+    checkpoint.save([])
+    assert not GridSearchCheckpoint(SEARCH, interval=0).load()
@@ -0,0 +1,40 @@
+import os
+
+import numpy as np
+
+from src.grid_search_executor import GridSearchExecutor
+
+CANDIDATES = [(uuid, {'number_of_generations': 5, 'hidden_layer_sizes': hidden_layer_sizes, 'seed': 0})
+              for uuid, hidden_layer_sizes in enumerate([(8,), (8, 4), (4,), (4, 2)], 1)]
+
+
+def run_search(dataset, number_of_workers):
+    results = []
+    GridSearchExecutor(number_of_workers=number_of_workers).run(
+        candidates=CANDIDATES, dataset=dataset,
+        on_result=lambda uuid, classifier, training_error, validation_error: results.append(
+            (uuid, classifier.get_uuid(), classifier.get_hidden_layer_sizes(), training_error, validation_error)))
+    return results
+
+
+def test_process_pool(workspace, dataset):
+    # the classifiers trained by the workers are the ones trained sequentially, passed in the candidates order
+    sequential = run_search(dataset, 1)
+    assert [result[0] for result in sequential] == [1, 2, 3, 4]
+    assert [result[1] for result in sequential] == [1, 2, 3, 4]
+    assert run_search(dataset, 2) == sequential
+
+    # the temporary snapshot shared with the workers is removed
+    assert os.listdir(workspace / 'data') == []
+
+
+def test_memory_mapped_snapshot(workspace, dataset):
+    # the memory mapped arrays are shared as they are, only the others are written
+    path = str(workspace / 'data' / 'training_data.npy')
+    np.save(path, dataset['training_data'])
+    snapshot_paths, temporary_paths = GridSearchExecutor()._write_snapshot(
+        dataset | {'training_data': np.load(path, mmap_mode='r')})
+    assert snapshot_paths[0] == path
+    assert sorted(os.path.basename(path) for path in temporary_paths) == [
+        'grid_search_training_labels.npy', 'grid_search_validation_data.npy', 'grid_search_validation_labels.npy']
+    assert np.load(snapshot_paths[2]).dtype == np.float32
@@ -0,0 +1,70 @@
+import sqlite3
+
+from src.grid_search_result_cache import GridSearchResultCache
+from src.mental_command_classifier import MentalCommandClassifier
+
+PARAMETERS = {'number_of_generations': 5, 'hidden_layer_sizes': (8, 4), 'seed': 0}
+
+
+def train(dataset, training_parameters):
+    mental_command_classifier = MentalCommandClassifier(training_parameters=training_parameters)
+    mental_command_classifier.train_classifier(dataset['training_data'], dataset['training_labels'])
+    return mental_command_classifier.get_classifier()
+
+
+def count_rows(workspace):
+    with sqlite3.connect(workspace / 'data' / 'result_cache.db') as conn:
+        return conn.execute('SELECT COUNT(*) FROM result_cache').fetchone()[0]
+
+
+def test_is_cacheable():
+    assert GridSearchResultCache.is_cacheable(PARAMETERS)
+    assert not GridSearchResultCache.is_cacheable(PARAMETERS | {'seed': None})
+
+
+def test_single_write_per_search(workspace, dataset):
+    result_cache = GridSearchResultCache('abc')
+    result_cache.put(PARAMETERS, train(dataset, PARAMETERS), 0.9, 0.8)
+    result_cache.put(PARAMETERS | {'number_of_generations': 10}, None, 0.95, 0.85)
+
+    # the results are visible before the write, the database is written only by flush()
+    assert result_cache.get(PARAMETERS, need_model=False) == (None, 0.9, 0.8)
+    assert count_rows(workspace) == 0
+    result_cache.flush()
+    assert count_rows(workspace) == 2
+
+    result_cache = GridSearchResultCache('abc')
+    assert result_cache.get(PARAMETERS | {'number_of_generations': 10}, need_model=False) == (None, 0.95, 0.85)
+    assert result_cache.get(PARAMETERS | {'seed': 1}, need_model=False) is None
+    # the models aren't stored by default
+    assert result_cache.get(PARAMETERS, need_model=True) is None
+
+
+def test_stored_models_and_warm_start(workspace, dataset):
+    result_cache = GridSearchResultCache('abc', store_models=True, warm_start=True)
+    result_cache.put(PARAMETERS, train(dataset, PARAMETERS), 0.9, 0.8)
+    result_cache.flush()
+
+    model, training_error, validation_error = result_cache.get(PARAMETERS)
+    assert model.get_params()['max_iter'] == 5 and (training_error, validation_error) == (0.9, 0.8)
+
+    # the cached model with fewer generations is the starting point of a longer training
+    warm_start_model = result_cache.get_warm_start_model(PARAMETERS | {'number_of_generations': 10})
+    assert warm_start_model.get_params()['max_iter'] == 5
+    assert result_cache.get_warm_start_model(PARAMETERS | {'number_of_generations': 3}) is None
+    assert GridSearchResultCache('abc', store_models=True).get_warm_start_model(
+        PARAMETERS | {'number_of_generations': 10}) is None
+
+
+def test_prune_other_datasets(workspace):
+    result_cache = GridSearchResultCache('abc')
+    result_cache.put(PARAMETERS, None, 0.9, 0.8)
+    result_cache.flush()
+
+    # the results of the other datasets are kept by default
+    GridSearchResultCache('def')
+    assert count_rows(workspace) == 1
+
+    # the results of a dataset no longer stored are deleted only if requested
+    assert GridSearchResultCache('def', prune_other_datasets=True).get(PARAMETERS, need_model=False) is None
+    assert count_rows(workspace) == 0
@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.incremental_update_controller import IncrementalUpdateController
+from src.mental_command_classifier import MentalCommandClassifier
+
+
+@pytest.fixture
+def dataset():
+    # well separated command thoughts (a different mean for each one), an accurate classifier is quickly found
+    rng = np.random.default_rng(1)
+    labels = rng.integers(0, 3, size=600)
+    data = (rng.normal(size=(600, 89)) + rng.normal(size=(3, 89))[labels]).astype(np.float32)
+    return {'training_data': data[:300], 'training_labels': labels[:300],
+            'test_data': data[300:], 'test_labels': labels[300:]}
+
+
+@pytest.fixture
+def best_classifier(workspace, dataset):
+    mental_command_classifier = MentalCommandClassifier(training_parameters={'number_of_generations': 50,
+                                                                             'hidden_layer_sizes': (16,), 'seed': 0})
+    mental_command_classifier.train_classifier(dataset['training_data'], dataset['training_labels'])
+    mental_command_classifier.store(file_name='best_classifier.sav')
+    with open(workspace / 'data' / 'best_classifier.sav', 'rb') as f:
+        return f.read()
+
+
+def read_best_classifier(workspace):
+    with open(workspace / 'data' / 'best_classifier.sav', 'rb') as f:
+        return f.read()
+
+
+def test_good_update(workspace, dataset, best_classifier):
+    # the new sessions have the same distribution, the updated classifier is accurate
+    assert IncrementalUpdateController.is_available()
+    controller = IncrementalUpdateController(number_of_generations=5)
+    assert controller.run(dataset=dataset, test_error_threshold=0.3)
+    assert controller.mental_command_classifier.get_error(dataset['test_data'], dataset['test_labels']) >= 0.7
+
+    # the best classifier is replaced only when the test report is accepted
+    assert IncrementalUpdateController.is_pending()
+    assert read_best_classifier(workspace) == best_classifier
+    IncrementalUpdateController.accept_update()
+    assert not IncrementalUpdateController.is_pending()
+    assert read_best_classifier(workspace) != best_classifier
+
+
+def test_bad_update(workspace, dataset, best_classifier):
+    # the new training sessions have wrong labels, the updated classifier misclassifies the test sessions
+    controller = IncrementalUpdateController(number_of_generations=50)
+    assert not controller.run(dataset=dataset | {'training_labels': (dataset['training_labels'] + 1) % 3},
+                              test_error_threshold=0.3)
+    assert controller.mental_command_classifier.get_error(dataset['test_data'], dataset['test_labels']) < 0.7
+    assert not IncrementalUpdateController.is_pending()
+    assert read_best_classifier(workspace) == best_classifier
+
+
+def test_rejected_report(workspace, dataset, best_classifier):
+    assert IncrementalUpdateController(number_of_generations=5).run(dataset=dataset, test_error_threshold=0.3)
+    IncrementalUpdateController.discard_update()
+    assert sorted(os.listdir(workspace / 'data')) == ['best_classifier.sav']
+    assert read_best_classifier(workspace) == best_classifier
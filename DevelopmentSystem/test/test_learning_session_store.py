@@ -0,0 +1,98 @@
+import numpy as np
+
+from src.learning_session_store import LearningSessionStore, BANDS
+
+
+def columnar_dataset(seed=0):
+    # dataset in the columnar format sent by the Segregation System
+    rng = np.random.default_rng(seed)
+    dataset = {}
+    for set_name, sessions in [('training', 12), ('validation', 6), ('testing', 4)]:
+        dataset[set_name] = {
+            'features': rng.integers(0, 1000, size=(sessions, len(BANDS), 22)).astype(np.float32),
+            'environments': rng.choice(['indoor', 'outdoor'], size=sessions),
+            'command_thoughts': rng.choice(['move', 'stop', 'left', 'right'], size=sessions)
+        }
+    return dataset
+
+
+def test_read_dataset(workspace):
+    dataset = columnar_dataset()
+    learning_session_store = LearningSessionStore()
+    assert learning_session_store.store_dataset(dataset)
+
+    # features (with the environment) and labels of the same rows are read with a single query
+    queries = []
+    learning_session_store._conn.set_trace_callback(queries.append)
+    data, labels = learning_session_store._read_dataset('training_set')
+    assert len(queries) == 1
+    assert data.dtype == np.float32 and data.shape == (12, 89) and data.flags['C_CONTIGUOUS']
+    assert labels.dtype == np.int64 and labels.shape == (12,)
+
+    stored = {tuple(row[:-1]): row[-1] for row in np.column_stack([data, labels])}
+    environments = (dataset['training']['environments'] == 'outdoor').astype(np.float32)
+    for features, environment, command_thought in zip(dataset['training']['features'], environments,
+                                                      dataset['training']['command_thoughts']):
+        label = ['move', 'stop', 'left', 'right'].index(command_thought)
+        assert stored[tuple(np.append(features.ravel(), environment))] == label
+
+
+def test_cached_sets(workspace):
+    learning_session_store = LearningSessionStore()
+    learning_session_store.store_dataset(columnar_dataset())
+    training_set = learning_session_store.get_training_set()
+
+    # the sets are decoded once
+    queries = []
+    learning_session_store._conn.set_trace_callback(queries.append)
+    assert learning_session_store.get_training_set()['training_data'] is training_set['training_data']
+    assert len(learning_session_store.get_test_set()['test_labels']) == 4
+    assert not any(query.startswith('SELECT ALPHA') for query in queries)
+
+    # the cache is emptied with the dataset
+    assert learning_session_store.delete_dataset()
+    assert learning_session_store._cache == {}
+
+
+def test_snapshot(workspace):
+    learning_session_store = LearningSessionStore()
+    learning_session_store.store_dataset(columnar_dataset())
+    dataset_hash = learning_session_store.get_dataset_hash()
+    snapshot_path = workspace / 'data' / 'snapshots' / dataset_hash
+    assert sorted(path.name for path in snapshot_path.iterdir()) == sorted(
+        f'{table}_{array}.npy' for table in ['training_set', 'validation_set', 'test_set']
+        for array in ['data', 'labels'])
+
+    # the sets are read-only memory mapped views of the snapshot, also for a new store (after a restart)
+    training_set = learning_session_store.get_training_set()
+    modification_time = (snapshot_path / 'training_set_data.npy').stat().st_mtime_ns
+    restarted_store = LearningSessionStore()
+    restarted_training_set = restarted_store.get_training_set()
+    assert isinstance(restarted_training_set['training_data'], np.memmap)
+    assert not restarted_training_set['training_data'].flags['WRITEABLE']
+    assert restarted_training_set['training_data'].filename == str(snapshot_path / 'training_set_data.npy')
+    assert np.array_equal(restarted_training_set['training_data'], training_set['training_data'])
+    assert (snapshot_path / 'training_set_data.npy').stat().st_mtime_ns == modification_time
+    assert restarted_store.get_dataset_hash() == dataset_hash
+
+    # the same content has the same hash, the snapshot is removed with the dataset
+    assert restarted_store.delete_dataset()
+    assert not snapshot_path.exists() and restarted_store.get_dataset_hash() is None
+    restarted_store.store_dataset(columnar_dataset())
+    assert restarted_store.get_dataset_hash() == dataset_hash
+
+
+def test_snapshot_created_on_read(workspace):
+    # a dataset stored without snapshot (previous version) gets it at the first read
+    learning_session_store = LearningSessionStore()
+    learning_session_store.store_dataset(columnar_dataset())
+    expected = learning_session_store.get_validation_set()['validation_data'].copy()
+    learning_session_store.delete_dataset()
+    learning_session_store.store_dataset(columnar_dataset())
+    learning_session_store._conn.execute('DELETE FROM dataset_snapshot')
+    learning_session_store._conn.commit()
+    learning_session_store._cache.clear()
+
+    validation_set = LearningSessionStore().get_validation_set()
+    assert isinstance(validation_set['validation_data'], np.memmap)
+    assert np.array_equal(validation_set['validation_data'], expected)
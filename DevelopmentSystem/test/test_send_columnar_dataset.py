@@ -0,0 +1,33 @@
+import io
+import json
+import os
+from time import sleep
+
+import numpy as np
+from requests import post
+
+BANDS = ['alpha', 'beta', 'delta', 'theta']
+
+if __name__ == '__main__':
+    with open(os.path.join(os.path.abspath('.'), 'dataset_300.json')) as f:
+        dataset = json.load(f)
+
+    # convert the dataset to the columnar format sent by the Segregation System
+    columns = {}
+    for name, sessions in dataset.items():
+        columns[f'{name}_features'] = np.array([[session['features'][band] for band in BANDS]
+                                                for session in sessions], dtype=np.float32)
+        columns[f'{name}_environments'] = np.array([session['features']['environment'] for session in sessions])
+        columns[f'{name}_command_thoughts'] = np.array([session['command_thought'] for session in sessions])
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **columns)
+    payload = buffer.getvalue()
+    print(f'[+] json size: {len(json.dumps(dataset))} bytes, columnar size: {len(payload)} bytes')
+
+    sleep(5)
+    i = 0
+    while True:
+        post('http://localhost:5000/dataset', data=payload, headers={'Content-Type': 'application/octet-stream'})
+        print(f'[+] sent dataset {i}')
+        i += 1
+        sleep(4)
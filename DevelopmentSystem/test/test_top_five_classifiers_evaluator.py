@@ -0,0 +1,49 @@
+import os
+
+from src.mental_command_classifier import MentalCommandClassifier
+from src.top_five_classifiers_evaluator import TopFiveClassifierEvaluators
+
+
+def new_classifier(uuid):
+    return MentalCommandClassifier(uuid=uuid, training_parameters={'number_of_generations': 1,
+                                                                   'hidden_layer_sizes': (uuid,)})
+
+
+def report_uuids(evaluator):
+    report = evaluator.get_top_classifiers(number_of_generations=1, validation_error_threshold=0.3)
+    return [classifier['uuid'] for classifier in report['classifiers']]
+
+
+def test_ordering_and_ties(workspace):
+    evaluator = TopFiveClassifierEvaluators(dataset={})
+    for uuid, validation_error in enumerate([0.5, 0.7, 0.6, 0.7, 0.4, 0.6, 0.8], 1):
+        evaluator.evaluate_new_classifier(new_classifier(uuid), training_error=0.9,
+                                          validation_error=validation_error)
+
+    # the report is ordered by descending validation error, with the same error the first trained comes first.
+    # The worst ones are evicted (uuid 5 and uuid 1), a tie doesn't evict the older classifier
+    assert report_uuids(evaluator) == [7, 2, 4, 3, 6]
+
+    evaluator.evaluate_new_classifier(new_classifier(8), training_error=0.9, validation_error=0.6)
+    assert report_uuids(evaluator) == [7, 2, 4, 3, 6]
+
+
+def test_store_and_evict(workspace):
+    evaluator = TopFiveClassifierEvaluators(dataset={}, number_of_classifiers=2)
+    for uuid, validation_error in [(1, 0.5), (2, 0.6)]:
+        evaluator.evaluate_new_classifier(new_classifier(uuid), training_error=0.9,
+                                          validation_error=validation_error)
+    assert evaluator.store_top_classifiers() == [[1, 0.9, 0.5], [2, 0.9, 0.6]]
+    assert sorted(os.listdir(workspace / 'data')) == ['1.sav', '2.sav']
+
+    # the evicted classifier is removed from disk, the new one is stored only once
+    evaluator.evaluate_new_classifier(new_classifier(3), training_error=0.9, validation_error=0.7)
+    assert sorted(uuid for uuid, _, _ in evaluator.store_top_classifiers()) == [2, 3]
+    evaluator.remove_evicted_classifiers()
+    assert sorted(os.listdir(workspace / 'data')) == ['2.sav', '3.sav']
+
+    # a top classifier of an interrupted search is restored from disk
+    restored = TopFiveClassifierEvaluators(dataset={}, number_of_classifiers=2)
+    restored.restore_classifier(3, 0.9, 0.7)
+    restored.restore_classifier(2, 0.9, 0.6)
+    assert report_uuids(restored) == [3, 2]
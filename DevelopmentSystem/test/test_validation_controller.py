@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+from src import grid_search_executor
+from src.grid_search_checkpoint import GridSearchCheckpoint
+from src.validation_controller import ValidationController
+
+
+class ScoreExecutor:
+    # executor returning a fixed validation error for each uuid, without training
+    def __init__(self, validation_errors):
+        self.validation_errors = validation_errors
+        self.rounds = []
+
+    def run(self, candidates, dataset, on_result, result_cache=None, need_models=True):
+        self.rounds.append(([uuid for uuid, _ in candidates],
+                            {parameters['number_of_generations'] for _, parameters in candidates}))
+        for uuid, _ in candidates:
+            on_result(uuid, None, 0.0, self.validation_errors[uuid])
+
+
+def count_trainings(monkeypatch):
+    # list filled with the (uuid, training parameters) of the trained candidates
+    trained = []
+    evaluate_candidate = grid_search_executor._evaluate_candidate
+    monkeypatch.setattr(grid_search_executor, '_evaluate_candidate',
+                        lambda *args: trained.append(args[1:]) or evaluate_candidate(*args))
+    return trained
+
+
+def new_controller(**kwargs):
+    return ValidationController(number_of_hidden_layers_range=[1, 3], number_of_hidden_neurons_range=[1, 16],
+                                number_of_workers=1, seed=0, **kwargs)
+
+
+def run_search(workspace, dataset, number_of_generations, **kwargs):
+    with open(workspace / 'data' / 'number_of_generations.json', 'w') as f:
+        json.dump({'number_of_generations': number_of_generations}, f)
+    new_controller(**kwargs).run(operational_mode='grid_search', dataset=dataset, validation_error_threshold=0.3)
+    with open(workspace / 'data' / 'top_five_classifiers_report.json') as f:
+        return json.load(f)
+
+
+def test_successive_halving_survivors(workspace):
+    # 9 candidates: one round with a third of the generations, then the best 5 (the first one on ties)
+    validation_errors = {1: 0.5, 2: 0.9, 3: 0.6, 4: 0.6, 5: 0.1, 6: 0.6, 7: 0.8, 8: 0.2, 9: 0.3}
+    executor = ScoreExecutor(validation_errors)
+    candidates = [(uuid, {'number_of_generations': 9, 'hidden_layer_sizes': (uuid,)}) for uuid in range(1, 10)]
+    survivors = new_controller(halving_factor=3)._successive_halving(
+        executor, candidates, {}, GridSearchCheckpoint({}, interval=0), None, None)
+
+    assert executor.rounds == [(list(range(1, 10)), {3})]
+    assert [uuid for uuid, _ in survivors] == [2, 3, 4, 6, 7]
+
+
+def test_successive_halving_search(workspace, dataset, monkeypatch):
+    # the 9 candidates are trained with 2 generations, the 5 survivors with all the 6 generations
+    trained = count_trainings(monkeypatch)
+    report = run_search(workspace, dataset, 6, search_mode='successive_halving', checkpoint_interval=0)
+    assert [parameters['number_of_generations'] for _, parameters in trained] == [2] * 9 + [6] * 5
+    assert {classifier['uuid'] for classifier in report['classifiers']} == {uuid for uuid, _ in trained[9:]}
+
+
+@pytest.mark.parametrize('search_mode', ['grid', 'successive_halving'])
+def test_one_generation(workspace, dataset, search_mode):
+    # the halving rounds have the same generations of the final training, which must still train the survivors
+    report = run_search(workspace, dataset, 1, search_mode=search_mode)
+    assert len(report['classifiers']) == 5
+
+
+@pytest.mark.parametrize('search_mode, number_of_trainings', [('grid', 9), ('successive_halving', 9 + 5)])
+def test_resume_after_crash(workspace, dataset, search_mode, number_of_trainings, monkeypatch):
+    expected = run_search(workspace, dataset, 6, search_mode=search_mode)
+
+    # crash after a few trained candidates, the checkpoint is saved after each of them
+    add_result = GridSearchCheckpoint.add_result
+    calls = []
+
+    def crashing_add_result(self, *args):
+        calls.append(args)
+        if len(calls) == 7:
+            raise KeyboardInterrupt
+        return add_result(self, *args)
+
+    monkeypatch.setattr(GridSearchCheckpoint, 'add_result', crashing_add_result)
+    with pytest.raises(KeyboardInterrupt):
+        run_search(workspace, dataset, 6, search_mode=search_mode, checkpoint_interval=1, dataset_hash='abc')
+    monkeypatch.setattr(GridSearchCheckpoint, 'add_result', add_result)
+
+    # the candidates trained before the crash aren't trained again
+    trained = count_trainings(monkeypatch)
+    assert run_search(workspace, dataset, 6, search_mode=search_mode, checkpoint_interval=1,
+                      dataset_hash='abc') == expected
+    assert len(trained) == number_of_trainings - 6
+    assert not (workspace / 'data' / 'grid_search_checkpoint.json').exists()
+
+
+def test_result_cache(workspace, dataset, monkeypatch):
+    result_cache = {'enabled': True, 'store_models': True}
+    expected = run_search(workspace, dataset, 6, dataset_hash='abc', result_cache=result_cache)
+
+    # the second search is served by the cache
+    trained = count_trainings(monkeypatch)
+    assert run_search(workspace, dataset, 6, dataset_hash='abc', result_cache=result_cache) == expected
+    assert trained == []
+
+
+def test_result_cache_without_models(workspace, dataset, monkeypatch):
+    # only the cached validation errors are stored by default
+    result_cache = {'enabled': True}
+    expected = run_search(workspace, dataset, 6, dataset_hash='abc', result_cache=result_cache)
+
+    # only the candidates that can be in the top five are trained again
+    trained = count_trainings(monkeypatch)
+    assert run_search(workspace, dataset, 6, dataset_hash='abc', result_cache=result_cache) == expected
+    assert len(trained) == 5
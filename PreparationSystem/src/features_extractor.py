@@ -2,6 +2,142 @@ import numpy as np
 from scipy.signal import welch
 from scipy.integrate import simps
 
+# Band power features always extracted, with the name they have in the prepared session
+BANDS = {'delta_wave': 'delta', 'theta_wave': 'theta', 'alpha_wave': 'alpha', 'beta_wave': 'beta'}
+
+
+class SessionSpectrum:
+    """
+    Class that computes once the power spectral density and the time-domain statistics of a session,
+    shared by all the features extracted from it.
+    """
+
+    sampling_frequency = 250
+    window_seconds = 1.25
+
+    def __init__(self, headset):
+        """
+        Computes the modified periodogram (Welch) of all the channels of the headset.
+        The PSD keeps the dtype of the headset, so a float32 headset is processed in float32.
+        :param headset: List of channels in the EEG headset, or headset array (channels x samples).
+        """
+        # Channels of different lengths (allowed by the raw session schema) have different frequency vectors,
+        # so each channel gets its own spectrum
+        self._channel_spectra = None
+        if not isinstance(headset, np.ndarray):
+            if len({len(channel) for channel in headset}) > 1:
+                self._channel_spectra = [SessionSpectrum(np.asarray([channel], dtype=np.float64))
+                                         for channel in headset]
+                return
+            headset = np.asarray(headset, dtype=np.float64)
+        self.headset = headset
+
+        # Define segment length
+        segment_length = self.window_seconds * self.sampling_frequency
+        self.frequencies, self.psd = welch(headset, self.sampling_frequency, nperseg=segment_length, axis=-1)
+        # Frequency resolution
+        self.frequency_resolution = self.frequencies[1] - self.frequencies[0]
+
+        self._band_powers = {}
+        self._variances = None
+
+    def band_power(self, start_frequency: float, end_frequency: float) -> np.ndarray:
+        """
+        Computes (once) the average power of every channel in a specified frequency range.
+        :param start_frequency: Starting frequency of the range in which to compute the average power in.
+        :param end_frequency: End frequency of the range in which to compute the average power in.
+        :return: Average power of each channel in the specified frequency range.
+        """
+        if self._channel_spectra is not None:
+            return np.concatenate([spectrum.band_power(start_frequency, end_frequency)
+                                   for spectrum in self._channel_spectra])
+        if (start_frequency, end_frequency) not in self._band_powers:
+            # Find intersecting values in frequency vector
+            intersecting_bands = np.logical_and(self.frequencies >= start_frequency,
+                                                self.frequencies <= end_frequency)
+            # Integral approximation of the spectrum using Simpson's rule.
+            self._band_powers[(start_frequency, end_frequency)] = \
+                simps(self.psd[:, intersecting_bands], dx=self.frequency_resolution, axis=-1)
+        return self._band_powers[(start_frequency, end_frequency)]
+
+    def total_power(self) -> np.ndarray:
+        """
+        :return: Average power of each channel over the whole spectrum.
+        """
+        if self._channel_spectra is not None:
+            return np.concatenate([spectrum.total_power() for spectrum in self._channel_spectra])
+        return self.band_power(self.frequencies[0], self.frequencies[-1])
+
+    def variances(self) -> tuple:
+        """
+        Computes (once) the variance of the signal and of its first and second derivatives.
+        :return: Tuple of arrays with the three variances of each channel.
+        """
+        if self._channel_spectra is not None:
+            return tuple(np.concatenate(variances) for variances in
+                         zip(*[spectrum.variances() for spectrum in self._channel_spectra]))
+        if self._variances is None:
+            first_derivative = np.diff(self.headset, axis=-1)
+            second_derivative = np.diff(first_derivative, axis=-1)
+            self._variances = (np.var(self.headset, axis=-1), np.var(first_derivative, axis=-1),
+                               np.var(second_derivative, axis=-1))
+        return self._variances
+
+
+    def spectral_entropy(self) -> np.ndarray:
+        """
+        Computes the Shannon entropy of the normalized PSD, divided by its maximum value.
+        :return: Normalized spectral entropy of each channel.
+        """
+        if self._channel_spectra is not None:
+            return np.concatenate([spectrum.spectral_entropy() for spectrum in self._channel_spectra])
+        probabilities = self.psd / np.sum(self.psd, axis=-1, keepdims=True)
+        entropy = -np.sum(probabilities * np.log2(probabilities, where=probabilities > 0,
+                                                  out=np.zeros_like(probabilities)), axis=-1)
+        return entropy / np.log2(self.psd.shape[-1])
+
+
+def _band_power(spectrum: SessionSpectrum, parameters: dict, features: dict) -> np.ndarray:
+    band = features[parameters['band']]
+    return spectrum.band_power(band['start_frequency'], band['end_frequency'])
+
+
+def _band_ratio(spectrum: SessionSpectrum, parameters: dict, features: dict) -> np.ndarray:
+    numerator = features[parameters['numerator']]
+    denominator = features[parameters['denominator']]
+    return spectrum.band_power(numerator['start_frequency'], numerator['end_frequency']) / \
+        spectrum.band_power(denominator['start_frequency'], denominator['end_frequency'])
+
+
+def _relative_power(spectrum: SessionSpectrum, parameters: dict, features: dict) -> np.ndarray:
+    return _band_power(spectrum, parameters, features) / spectrum.total_power()
+
+
+def _spectral_entropy(spectrum: SessionSpectrum, parameters: dict, features: dict) -> np.ndarray:
+    return spectrum.spectral_entropy()
+
+
+def _hjorth_mobility(spectrum: SessionSpectrum, parameters: dict, features: dict) -> np.ndarray:
+    variance, first_derivative_variance, _ = spectrum.variances()
+    return np.sqrt(first_derivative_variance / variance)
+
+
+def _hjorth_complexity(spectrum: SessionSpectrum, parameters: dict, features: dict) -> np.ndarray:
+    _, first_derivative_variance, second_derivative_variance = spectrum.variances()
+    return np.sqrt(second_derivative_variance / first_derivative_variance) / \
+        _hjorth_mobility(spectrum, parameters, features)
+
+
+# Types of the additional features that can be declared in the configuration
+FEATURE_TYPES = {
+    'band_power': _band_power,
+    'band_ratio': _band_ratio,
+    'relative_power': _relative_power,
+    'spectral_entropy': _spectral_entropy,
+    'hjorth_mobility': _hjorth_mobility,
+    'hjorth_complexity': _hjorth_complexity
+}
+
 
 class FeaturesExtractor:
     """
@@ -17,60 +153,39 @@ class FeaturesExtractor:
         :param operative_mode: Execution or development mode.
         :return: None
         """
-        delta, theta, alpha, beta = self._extract_headset_features(raw_session['headset'], features)
+        # The additional features are only part of the development sessions: the execution sessions keep
+        # the fixed vector (band powers and environment) expected by the Execution System and the classifier
+        delta, theta, alpha, beta, additional_features = \
+            self._extract_headset_features(raw_session['headset'], features, operative_mode == 'development')
         if operative_mode == 'development':
-            self._prepare_session_development(raw_session, prepared_session, delta, theta, alpha, beta)
+            self._prepare_session_development(raw_session, prepared_session, delta, theta, alpha, beta,
+                                              additional_features)
         elif operative_mode == 'execution':
             self._prepare_session_execution(raw_session, prepared_session, delta, theta, alpha, beta, features)
 
-    def _extract_headset_features(self, headset: list, features: dict):
+    @staticmethod
+    def _extract_headset_features(headset, features: dict, additional: bool = True):
         """
         Extracts the relevant features from the headset data of the raw EEG session data.
-        :param headset: List of channels in the EEG headset.
+        All the features are computed from the same PSD and time-domain statistics of the session.
+        :param headset: List of channels in the EEG headset, or headset array (channels x samples).
         :param features: Dictionary of features to extract from the headset data.
-        :return: Lists of extracted features in the different frequency bands.
-        """
-        delta, theta, alpha, beta = [], [], [], []
-        for channel in headset:
-            delta.append(self._compute_average_power(channel, features['delta_wave']['start_frequency'],
-                                                     features['delta_wave']['end_frequency']))
-            theta.append(self._compute_average_power(channel, features['theta_wave']['start_frequency'],
-                                                     features['theta_wave']['end_frequency']))
-            alpha.append(self._compute_average_power(channel, features['alpha_wave']['start_frequency'],
-                                                     features['alpha_wave']['end_frequency']))
-            beta.append(self._compute_average_power(channel, features['beta_wave']['start_frequency'],
-                                                    features['beta_wave']['end_frequency']))
-        return delta, theta, alpha, beta
-
-    @staticmethod
-    def _compute_average_power(headset: list, start_frequency: int, end_frequency: int) -> float:
+        :param additional: False to skip the additional features declared in the configuration.
+        :return: Lists of extracted features in the different frequency bands and dictionary
+        of the additional features declared in the configuration.
         """
-        Computes the average power in a specified frequency range.
-        :param headset: List of voltage data to compute average power on.
-        :param start_frequency: Starting frequency of the range in which to compute the average power in.
-        :param end_frequency: End frequency of the range in which to compute the average power in.
-        :return: Average power in the specified frequency range.
-        """
-        sampling_frequency = 250
-        window_seconds = 1.25
-        # Define segment length
-        segment_length = window_seconds * sampling_frequency
-
-        # Compute the modified periodogram (Welch)
-        frequencies, psd = welch(headset, sampling_frequency, nperseg=segment_length)
-
-        # Frequency resolution
-        frequency_resolution = frequencies[1] - frequencies[0]
-
-        # Find intersecting values in frequency vector
-        intersecting_bands = np.logical_and(frequencies >= start_frequency, frequencies <= end_frequency)
+        spectrum = SessionSpectrum(headset)
+        delta, theta, alpha, beta = [_band_power(spectrum, {'band': band}, features).tolist() for band in BANDS]
 
-        # Integral approximation of the spectrum using Simpson's rule.
-        return simps(psd[intersecting_bands], dx=frequency_resolution)
+        additional_features = {}
+        for feature in features.get('additional_features', []) if additional else []:
+            values = FEATURE_TYPES[feature['type']](spectrum, feature, features)
+            additional_features[feature['name']] = values.tolist()
+        return delta, theta, alpha, beta, additional_features
 
     @staticmethod
     def _prepare_session_development(raw_session: dict, prepared_session: dict, delta: list, theta: list,
-                                     alpha: list, beta: list):
+                                     alpha: list, beta: list, additional_features: dict):
         """
         Prepares the session (development mode).
         :param raw_session: Raw session data.
@@ -79,6 +194,7 @@ class FeaturesExtractor:
         :param theta: Average power on the theta frequency band.
         :param alpha: Average power on the alpha frequency band.
         :param beta: Average power on the beta frequency band.
+        :param additional_features: Additional features declared in the configuration.
         :return: None
         """
         prepared_session['uuid'] = raw_session['uuid']
@@ -87,6 +203,7 @@ class FeaturesExtractor:
         prepared_session['features']['theta'] = theta
         prepared_session['features']['alpha'] = alpha
         prepared_session['features']['beta'] = beta
+        prepared_session['features'].update(additional_features)
         prepared_session['features']['environment'] = raw_session['environment']
         prepared_session['calendar'] = raw_session['calendar']
         prepared_session['command_thought'] = raw_session['command_thought']
@@ -1,9 +1,18 @@
+import json
 import queue
 from threading import Thread
 
 from flask import Flask, request
 from requests import post, exceptions
 
+from src.session_cleaning import SessionCleaning
+
+try:
+    # orjson decodes the headset samples several times faster than the standard library
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 
 class JsonIO:
     """
@@ -19,6 +28,8 @@ class JsonIO:
         """
         self.app = Flask(__name__)
         self._received_json_queue = queue.Queue()
+        self._headset_dtype = None
+        self._profiler = None
 
     def listener(self, ip, port):
         """
@@ -36,6 +47,47 @@ class JsonIO:
         """
         return self._received_json_queue.get(block=True)
 
+    def set_headset_dtype(self, dtype):
+        """
+        Enables the decoding of the headset of the received raw sessions into an array of the given dtype.
+        :param dtype: Floating point type of the headset array, None to keep the headset as lists.
+        :return: None
+        """
+        self._headset_dtype = dtype
+
+    def decode(self, body: bytes):
+        """
+        Decodes the body of a request. If a headset dtype is set, the headset is stored straight into
+        a preallocated (channels x samples) array, while the scalar fields stay in the dict.
+        :param body: Body of the received request.
+        :return: The decoded JSON payload.
+        """
+        received_json = json_loads(body)
+        if self._headset_dtype is not None and isinstance(received_json, dict) and \
+                isinstance(received_json.get('headset'), list):
+            try:
+                headset = SessionCleaning.headset_to_array(received_json['headset'], self._headset_dtype)
+            except (TypeError, ValueError):
+                # Malformed headset, it is left as it is and discarded by the validation
+                headset = None
+            if headset is not None:
+                received_json['headset'] = headset
+        return received_json
+
+    def set_profiler(self, profiler):
+        """
+        Exposes the report of the stage profiler on the profiling endpoint.
+        :param profiler: StageProfiler of the Preparation System.
+        :return: None
+        """
+        self._profiler = profiler
+
+    def get_profiler(self):
+        """
+        :return: StageProfiler of the Preparation System, None if profiling is disabled.
+        """
+        return self._profiler
+
     # -------- SERVER HANDLER --------
 
     def receive(self, received_json):
@@ -91,12 +143,26 @@ def post_json():
     :return: Returns a JSON response with status code 200 if the request is successful,
             and with status code 500 if it's not.
     """
-    if request.json is None:
+    try:
+        received_json = JsonIO.get_instance().decode(request.get_data())
+    except ValueError:
+        received_json = None
+    if received_json is None:
         return {'error': 'No JSON received'}, 500
 
-    received_json = request.json
-
     new_thread = Thread(target=JsonIO.get_instance().receive, args=(received_json,))
     new_thread.start()
 
     return {}, 200
+
+
+@app.get('/profiling')
+def get_profiling():
+    """
+    The function is called when a get request is received on the profiling endpoint.
+    :return: Returns the profiling report with status code 200, or status code 404 if profiling is disabled.
+    """
+    profiler = JsonIO.get_instance().get_profiler()
+    if profiler is None:
+        return {'error': 'Profiling disabled'}, 404
+    return profiler.get_report(), 200
@@ -2,10 +2,12 @@ import json
 import os
 from datetime import datetime
 from threading import Thread
+import numpy as np
 from jsonschema import validate, ValidationError
 from src.json_io import JsonIO
 from src.session_cleaning import SessionCleaning
 from src.features_extractor import FeaturesExtractor
+from src.stage_profiler import StageProfiler
 
 
 class PreparationSystem:
@@ -21,9 +23,18 @@ class PreparationSystem:
         """
         self._preparation_system_configuration = self._validate_configuration()
         print(f'[+] The configuration is valid, {self._preparation_system_configuration["operative_mode"]} mode')
+        if self._preparation_system_configuration.get('float32_pipeline', False):
+            # The headset of the raw sessions is decoded into a float32 array on arrival
+            JsonIO.get_instance().set_headset_dtype(np.float32)
         self._raw_session = None
         self._prepared_session = None
 
+        # Optional per-stage profiling, the report is available on SIGUSR1 or over HTTP
+        self._profiler = StageProfiler(self._preparation_system_configuration.get('profiling'))
+        if self._profiler.is_enabled():
+            JsonIO.get_instance().set_profiler(self._profiler)
+            print('[+] Profiling enabled')
+
     def run(self):
         """
         Method that runs all the instructions needed for session preparation.
@@ -40,43 +51,62 @@ class PreparationSystem:
             self._raw_session = JsonIO.get_instance().get_received_json()
             print('[+] Raw session received')
 
-            # Check raw session validity
-            if SessionCleaning.validate_raw_session(self._raw_session):
-                print('[+] Raw session is valid')
-            else:
-                print('[-] Raw session is not valid')
-                continue
-
-            # Correct missing samples
-            if SessionCleaning().correct_missing_samples(self._raw_session['headset']):
-                print('[+] Headset samples ok')
-            else:
-                print('[-] Missing samples are unrecoverable, raw session discarded')
-                continue
-
-            # Correct outliers
-            SessionCleaning.correct_outliers(self._raw_session['headset'],
-                                             self._preparation_system_configuration['min_eeg'],
-                                             self._preparation_system_configuration['max_eeg'])
-
-            # Extract features and prepare session
-            self._prepared_session = {}
-            FeaturesExtractor().extract_features \
-                (self._preparation_system_configuration['features'], self._raw_session, self._prepared_session,
-                 self._preparation_system_configuration['operative_mode'])
-            print('[+] Features extracted and session prepared')
-
-            # Send prepared session to the endpoint corresponding to the current operating mode
-            if self._preparation_system_configuration['operative_mode'] == 'development':
-                if JsonIO.get_instance().send(self._preparation_system_configuration['segregation_endpoint_IP'],
-                                              self._preparation_system_configuration['segregation_endpoint_port'],
-                                              self._prepared_session):
-                    print(f'[+] Prepared session sent at {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
-
-            elif self._preparation_system_configuration['operative_mode'] == 'execution':
-                if JsonIO.get_instance().send(self._preparation_system_configuration['execution_endpoint_IP'],
-                                              self._preparation_system_configuration['execution_endpoint_port'],
-                                              self._prepared_session):
+            # The session ends also when it is discarded
+            with self._profiler.session():
+                # Check raw session validity
+                with self._profiler.stage('validate'):
+                    valid = SessionCleaning.validate_raw_session(self._raw_session)
+                if valid:
+                    print('[+] Raw session is valid')
+                else:
+                    print('[-] Raw session is not valid')
+                    continue
+
+                # Convert the headset into a contiguous float32 array if not done on arrival (float32 pipeline)
+                if self._preparation_system_configuration.get('float32_pipeline', False) and \
+                        not isinstance(self._raw_session['headset'], np.ndarray):
+                    with self._profiler.stage('headset_to_array'):
+                        self._raw_session['headset'] = SessionCleaning.headset_to_array(self._raw_session['headset'])
+                    if self._raw_session['headset'] is None:
+                        print('[-] Headset channels have different lengths, raw session discarded')
+                        continue
+
+                # Correct missing samples
+                with self._profiler.stage('correct_missing_samples'):
+                    recovered = SessionCleaning().correct_missing_samples(self._raw_session['headset'])
+                if recovered:
+                    print('[+] Headset samples ok')
+                else:
+                    print('[-] Missing samples are unrecoverable, raw session discarded')
+                    continue
+
+                # Correct outliers
+                with self._profiler.stage('correct_outliers'):
+                    SessionCleaning.correct_outliers(self._raw_session['headset'],
+                                                     self._preparation_system_configuration['min_eeg'],
+                                                     self._preparation_system_configuration['max_eeg'])
+
+                # Extract features and prepare session
+                self._prepared_session = {}
+                with self._profiler.stage('extract_features'):
+                    FeaturesExtractor().extract_features \
+                        (self._preparation_system_configuration['features'], self._raw_session, self._prepared_session,
+                         self._preparation_system_configuration['operative_mode'])
+                print('[+] Features extracted and session prepared')
+
+                # Send prepared session to the endpoint corresponding to the current operating mode
+                with self._profiler.stage('send'):
+                    if self._preparation_system_configuration['operative_mode'] == 'development':
+                        sent = JsonIO.get_instance().send(
+                            self._preparation_system_configuration['segregation_endpoint_IP'],
+                            self._preparation_system_configuration['segregation_endpoint_port'],
+                            self._prepared_session)
+                    else:
+                        sent = JsonIO.get_instance().send(
+                            self._preparation_system_configuration['execution_endpoint_IP'],
+                            self._preparation_system_configuration['execution_endpoint_port'],
+                            self._prepared_session)
+                if sent:
                     print(f'[+] Prepared session sent at {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
         exit(0)
 
@@ -0,0 +1,182 @@
+import cProfile
+import json
+import os
+import signal
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from threading import RLock
+from time import perf_counter
+
+import numpy as np
+
+
+class StageProfiler:
+    """
+    Class that records the wall time and the allocated memory of every stage of the session preparation
+    in a ring buffer, and optionally captures a cProfile or tracemalloc profile of the first sessions.
+    """
+
+    def __init__(self, configuration: dict = None):
+        """
+        Initializes the profiler from the 'profiling' section of the configuration.
+        :param configuration: Profiling configuration, None to disable the profiler.
+        """
+        configuration = configuration or {}
+        self._enabled = configuration.get('enabled', False)
+        self._trace_allocations = configuration.get('trace_allocations', False)
+        self._capture_mode = configuration.get('capture_mode', 'none')
+        self._capture_sessions = configuration.get('capture_sessions', 0)
+
+        self._records = deque(maxlen=configuration.get('ring_buffer_size', 1000))
+        # Reentrant because the SIGUSR1 handler reads the records on the main thread, possibly while a stage
+        # of the same thread is appending its record
+        self._lock = RLock()
+        self._session_counter = 0
+        self._profile = None
+
+        data_path = os.path.join(os.path.abspath('..'), 'data')
+        self._report_path = os.path.join(data_path, 'profiling_report.json')
+        self._cprofile_path = os.path.join(data_path, 'profiling_capture.prof')
+        self._tracemalloc_path = os.path.join(data_path, 'profiling_capture.txt')
+
+        if not self._enabled:
+            return
+        if self._trace_allocations or self._capture_mode == 'tracemalloc':
+            tracemalloc.start()
+        if self._capture_mode == 'cprofile':
+            self._profile = cProfile.Profile()
+        # The report can be dumped at any time sending SIGUSR1 to the process
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.dump_report())
+
+    def is_enabled(self) -> bool:
+        """
+        :return: True if the profiler is enabled.
+        """
+        return self._enabled
+
+    @contextmanager
+    def session(self):
+        """
+        Returns the context manager that delimits the preparation of a session, also when it is discarded.
+        :return: The context manager of the session.
+        """
+        self.start_session()
+        try:
+            yield
+        finally:
+            self.end_session()
+
+    def start_session(self):
+        """
+        Notifies the profiler that the preparation of a new session starts.
+        The capture (if any) covers the first capture_sessions sessions.
+        :return: None
+        """
+        if not self._enabled:
+            return
+        self._session_counter += 1
+        if self._session_counter == 1 and self._profile is not None:
+            self._profile.enable()
+
+    def end_session(self):
+        """
+        Notifies the profiler that the preparation of the current session is completed.
+        The capture (if any) is saved as soon as the last captured session is completed.
+        :return: None
+        """
+        if not self._enabled or self._capture_mode == 'none':
+            return
+        if self._session_counter == self._capture_sessions:
+            self._save_capture()
+
+    def stage(self, name: str):
+        """
+        Returns the context manager that measures a stage of the session preparation.
+        :param name: Name of the stage.
+        :return: The context manager of the stage.
+        """
+        if not self._enabled:
+            return nullcontext()
+        return self._measure_stage(name)
+
+    @contextmanager
+    def _measure_stage(self, name: str):
+        """
+        Measures the wall time and the allocated memory (peak of the traced memory) of a stage.
+        :param name: Name of the stage.
+        """
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            wall_time = perf_counter() - start
+            allocated_bytes = tracemalloc.get_traced_memory()[1] - start_memory if tracing else None
+            with self._lock:
+                self._records.append({'session': self._session_counter, 'stage': name,
+                                      'wall_time_ms': wall_time * 1000, 'allocated_bytes': allocated_bytes})
+
+    def get_report(self) -> dict:
+        """
+        Summarizes the records in the ring buffer.
+        :return: Dictionary with the statistics of every stage and the records.
+        """
+        with self._lock:
+            records = list(self._records)
+
+        stages = {}
+        for record in records:
+            stages.setdefault(record['stage'], []).append(record)
+
+        report = {'sessions': self._session_counter, 'stages': {}, 'records': records}
+        for name, stage_records in stages.items():
+            wall_times = [record['wall_time_ms'] for record in stage_records]
+            report['stages'][name] = {
+                'count': len(stage_records),
+                'mean_wall_time_ms': float(np.mean(wall_times)),
+                'p50_wall_time_ms': float(np.percentile(wall_times, 50)),
+                'p99_wall_time_ms': float(np.percentile(wall_times, 99))
+            }
+            allocations = [record['allocated_bytes'] for record in stage_records
+                           if record['allocated_bytes'] is not None]
+            if allocations:
+                report['stages'][name]['mean_allocated_bytes'] = float(np.mean(allocations))
+                report['stages'][name]['max_allocated_bytes'] = int(np.max(allocations))
+        return report
+
+    def dump_report(self):
+        """
+        Saves the report in the data folder.
+        :return: None
+        """
+        try:
+            with open(self._report_path, 'w') as f:
+                json.dump(self.get_report(), f, indent=4)
+            print(f'[+] Profiling report saved in {self._report_path}')
+        except OSError:
+            print('[-] Failed to save the profiling report')
+
+    def _save_capture(self):
+        """
+        Stops the capture and saves it in the data folder.
+        :return: None
+        """
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self._cprofile_path)
+            self._profile = None
+            print(f'[+] cProfile capture of {self._capture_sessions} sessions saved in {self._cprofile_path}')
+
+        elif self._capture_mode == 'tracemalloc':
+            snapshot = tracemalloc.take_snapshot()
+            with open(self._tracemalloc_path, 'w') as f:
+                for statistic in snapshot.statistics('lineno')[:50]:
+                    f.write(f'{statistic}\n')
+            if not self._trace_allocations:
+                tracemalloc.stop()
+            print(f'[+] tracemalloc capture of {self._capture_sessions} sessions saved in {self._tracemalloc_path}')
@@ -0,0 +1,197 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+from datetime import datetime
+from time import perf_counter
+
+import numpy as np
+
+# Run from the 'test' folder (the configuration and the raw session schema are loaded from '..'):
+#   python preparation_benchmark.py --sessions 500 --samples 1375 --pattern one=9 --pattern three=7,9,11
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.session_cleaning import SessionCleaning  # noqa: E402
+from src.features_extractor import FeaturesExtractor  # noqa: E402
+
+SESSIONS = 200  # Default raw sessions processed for each scenario
+NUMBER_OF_SAMPLES = 1375  # Default samples per channel (5.5 seconds at 250 Hz)
+SEED = 42
+
+# Default channels removed from the generated sessions (only channels 8-12 are recoverable)
+MISSING_CHANNELS_PATTERNS = {
+    'no_missing_channels': [],
+    'one_missing_channel': [9],
+    'three_missing_channels': [7, 9, 11]
+}
+
+# Pipelines to compare (value of 'float32_pipeline' in the configuration)
+PIPELINES = {
+    'float64': False,
+    'float32': True
+}
+
+RESULTS_FILENAME = 'preparation_benchmark.json'
+
+
+def generate_raw_session(rng: random.Random, number_of_samples: int, missing_channels: list) -> dict:
+    """
+    Generates a synthetic raw session with 22 channels of gaussian EEG samples.
+    :param rng: Random generator.
+    :param number_of_samples: Number of samples of each channel.
+    :param missing_channels: Indexes of the channels to leave empty.
+    :return: The raw session.
+    """
+    headset = []
+    for channel in range(22):
+        if channel in missing_channels:
+            headset.append([])
+        else:
+            headset.append([rng.gauss(0, 8) for _ in range(number_of_samples)])
+    return {
+        'uuid': f'benchmark-{rng.randint(0, 10 ** 9)}',
+        'calendar': rng.choice(['sport', 'shopping', 'home', 'working']),
+        'command_thought': rng.choice(['move', 'stop', 'left', 'right']),
+        'environment': rng.choice(['indoor', 'outdoor']),
+        'headset': headset
+    }
+
+
+class PreparationBenchmark:
+    """
+    Times every stage of the Preparation System hot path on synthetic raw sessions.
+    """
+
+    def __init__(self):
+        with open(os.path.join(os.path.abspath('..'), 'preparation_system_configuration.json')) as f:
+            self._configuration = json.load(f)
+
+    def run_scenario(self, sessions: int, number_of_samples: int, missing_channels: list,
+                     float32_pipeline: bool, seed: int = SEED) -> dict:
+        """
+        Prepares the given number of synthetic sessions, timing each stage separately.
+        :param sessions: Number of raw sessions to prepare.
+        :param number_of_samples: Number of samples of each channel.
+        :param missing_channels: Indexes of the channels missing in every session.
+        :param float32_pipeline: True to benchmark the float32 pipeline.
+        :param seed: Seed of the generated sessions.
+        :return: Dictionary with the statistics of the scenario.
+        """
+        rng = random.Random(seed)
+        raw_sessions = [generate_raw_session(rng, number_of_samples, missing_channels) for _ in range(sessions)]
+
+        stages = ['validate', 'correct_missing_samples', 'correct_outliers', 'extract_features']
+        if float32_pipeline:
+            stages.insert(1, 'headset_to_array')
+        timings = {stage: [] for stage in stages}
+
+        for raw_session in raw_sessions:
+            start = perf_counter()
+            assert SessionCleaning.validate_raw_session(raw_session)
+            timings['validate'].append(perf_counter() - start)
+
+            if float32_pipeline:
+                start = perf_counter()
+                raw_session['headset'] = SessionCleaning.headset_to_array(raw_session['headset'])
+                timings['headset_to_array'].append(perf_counter() - start)
+
+            start = perf_counter()
+            assert SessionCleaning().correct_missing_samples(raw_session['headset'])
+            timings['correct_missing_samples'].append(perf_counter() - start)
+
+            start = perf_counter()
+            SessionCleaning.correct_outliers(raw_session['headset'], self._configuration['min_eeg'],
+                                             self._configuration['max_eeg'])
+            timings['correct_outliers'].append(perf_counter() - start)
+
+            start = perf_counter()
+            FeaturesExtractor().extract_features(self._configuration['features'], raw_session, {},
+                                                 self._configuration['operative_mode'])
+            timings['extract_features'].append(perf_counter() - start)
+
+        total = np.sum([timings[stage] for stage in stages], axis=0)
+        return {
+            'pipeline': 'float32' if float32_pipeline else 'float64',
+            'sessions': sessions,
+            'number_of_samples': number_of_samples,
+            'missing_channels': missing_channels,
+            'sessions_per_second': sessions / float(np.sum(total)),
+            'p50_ms': float(np.percentile(total, 50) * 1000),
+            'p99_ms': float(np.percentile(total, 99) * 1000),
+            'stages': {stage: self._stage_statistics(timings[stage]) for stage in stages}
+        }
+
+    @staticmethod
+    def _stage_statistics(timings: list) -> dict:
+        """
+        Computes the statistics of a stage.
+        :param timings: Time (in seconds) spent in the stage by each session.
+        :return: Dictionary with throughput and latency percentiles of the stage.
+        """
+        return {
+            'sessions_per_second': len(timings) / float(np.sum(timings)),
+            'mean_ms': float(np.mean(timings) * 1000),
+            'p50_ms': float(np.percentile(timings, 50) * 1000),
+            'p99_ms': float(np.percentile(timings, 99) * 1000)
+        }
+
+
+def parse_pattern(pattern: str) -> tuple:
+    """
+    Parses a missing channels pattern given on the command line.
+    :param pattern: Pattern in the form 'name=channel,channel,...' (e.g. 'three=7,9,11', 'none=').
+    :return: Tuple with the name and the list of missing channels of the pattern.
+    """
+    name, _, channels = pattern.partition('=')
+    if name == '':
+        raise argparse.ArgumentTypeError(f'invalid pattern \'{pattern}\', expected name=channel,channel,...')
+    try:
+        return name, [int(channel) for channel in channels.split(',') if channel != '']
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid channels in pattern \'{pattern}\'')
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parses the command line options of the benchmark.
+    :return: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark of the Preparation System hot path.')
+    parser.add_argument('--sessions', type=int, default=SESSIONS,
+                        help='raw sessions processed for each scenario')
+    parser.add_argument('--samples', type=int, default=NUMBER_OF_SAMPLES,
+                        help='samples of each channel')
+    parser.add_argument('--pattern', type=parse_pattern, action='append', dest='patterns',
+                        help='missing channels pattern as name=channel,channel,... (repeatable, '
+                             'default: none, one and three missing channels)')
+    parser.add_argument('--seed', type=int, default=SEED, help='seed of the generated sessions')
+    parser.add_argument('--output', default=RESULTS_FILENAME, help='path of the JSON results file')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_arguments()
+    patterns = dict(arguments.patterns) if arguments.patterns else MISSING_CHANNELS_PATTERNS
+
+    benchmark = PreparationBenchmark()
+    results = {
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'python_version': platform.python_version(),
+        'numpy_version': np.__version__,
+        'scenarios': []
+    }
+
+    for pipeline_name, pipeline in PIPELINES.items():
+        for pattern_name, pattern in patterns.items():
+            scenario = benchmark.run_scenario(arguments.sessions, arguments.samples, pattern, pipeline,
+                                              arguments.seed)
+            scenario['name'] = f'{pipeline_name}_{pattern_name}'
+            results['scenarios'].append(scenario)
+            print(f'[+] {scenario["name"]}: {scenario["sessions_per_second"]:.1f} sessions/s '
+                  f'(p50 {scenario["p50_ms"]:.2f} ms, p99 {scenario["p99_ms"]:.2f} ms)')
+
+    with open(arguments.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f'[+] Results saved in {arguments.output}')
@@ -0,0 +1,130 @@
+import copy
+import json
+import os
+
+import numpy as np
+import pytest
+from jsonschema import validate, ValidationError
+from scipy.signal import welch
+from scipy.integrate import simps
+
+from src.features_extractor import FeaturesExtractor
+from test.test_float32_pipeline import FEATURES, generate_raw_session
+
+ADDITIONAL_FEATURES = [
+    {'name': 'alpha_beta_ratio', 'type': 'band_ratio', 'numerator': 'alpha_wave', 'denominator': 'beta_wave'},
+    {'name': 'relative_alpha', 'type': 'relative_power', 'band': 'alpha_wave'},
+    {'name': 'spectral_entropy', 'type': 'spectral_entropy'},
+    {'name': 'hjorth_mobility', 'type': 'hjorth_mobility'},
+    {'name': 'hjorth_complexity', 'type': 'hjorth_complexity'}
+]
+
+
+def compute_average_power(channel, start_frequency, end_frequency):
+    # reference computation of a band power on a single channel
+    frequencies, psd = welch(channel, 250, nperseg=1.25 * 250)
+    intersecting_bands = np.logical_and(frequencies >= start_frequency, frequencies <= end_frequency)
+    return simps(psd[intersecting_bands], dx=frequencies[1] - frequencies[0])
+
+
+# ===================== BAND POWERS TEST ===================== #
+
+def test_band_powers():
+    raw_session = generate_raw_session(seed=2)
+    prepared_session = {}
+    FeaturesExtractor().extract_features(FEATURES, copy.deepcopy(raw_session), prepared_session, 'development')
+    for wave, band in [('delta_wave', 'delta'), ('theta_wave', 'theta'), ('alpha_wave', 'alpha'),
+                       ('beta_wave', 'beta')]:
+        expected = [compute_average_power(channel, FEATURES[wave]['start_frequency'],
+                                          FEATURES[wave]['end_frequency']) for channel in raw_session['headset']]
+        assert np.allclose(prepared_session['features'][band], expected, rtol=1e-12)
+
+
+# ===================== ADDITIONAL FEATURES TEST ===================== #
+
+def test_additional_features_development():
+    features = dict(FEATURES, additional_features=ADDITIONAL_FEATURES)
+    raw_session = generate_raw_session(seed=4)
+    headset = np.asarray(raw_session['headset'])
+    prepared_session = {}
+    FeaturesExtractor().extract_features(features, raw_session, prepared_session, 'development')
+
+    for feature in ADDITIONAL_FEATURES:
+        assert len(prepared_session['features'][feature['name']]) == 22
+
+    alpha = np.array(prepared_session['features']['alpha'])
+    beta = np.array(prepared_session['features']['beta'])
+    assert np.allclose(prepared_session['features']['alpha_beta_ratio'], alpha / beta)
+    assert np.all(np.array(prepared_session['features']['relative_alpha']) < 1)
+    entropy = np.array(prepared_session['features']['spectral_entropy'])
+    assert np.all((entropy > 0) & (entropy <= 1))
+
+    mobility = np.sqrt(np.var(np.diff(headset), axis=-1) / np.var(headset, axis=-1))
+    complexity = np.sqrt(np.var(np.diff(headset, n=2), axis=-1) / np.var(np.diff(headset), axis=-1)) / mobility
+    assert np.allclose(prepared_session['features']['hjorth_mobility'], mobility)
+    assert np.allclose(prepared_session['features']['hjorth_complexity'], complexity)
+
+
+def test_additional_features_execution():
+    features = dict(FEATURES, additional_features=ADDITIONAL_FEATURES[:2])
+    raw_session = generate_raw_session(seed=5)
+    expected = {}
+    FeaturesExtractor().extract_features(FEATURES, copy.deepcopy(raw_session), expected, 'execution')
+    prepared_session = {}
+    FeaturesExtractor().extract_features(features, raw_session, prepared_session, 'execution')
+
+    # the execution vector keeps the 89 features expected by the Execution System
+    assert len(prepared_session['features']) == 22 * 4 + 1
+    assert prepared_session['features'] == expected['features']
+
+
+# ===================== DIFFERENT CHANNEL LENGTHS TEST ===================== #
+
+def test_channels_of_different_lengths():
+    # the raw session schema allows channels of different lengths, each one gets its own spectrum
+    features = dict(FEATURES, additional_features=ADDITIONAL_FEATURES)
+    raw_session = generate_raw_session(seed=6)
+    raw_session['headset'][3] = raw_session['headset'][3][:1000]
+    raw_session['headset'][15] = raw_session['headset'][15][:500]
+    prepared_session = {}
+    FeaturesExtractor().extract_features(features, copy.deepcopy(raw_session), prepared_session, 'development')
+
+    for channel in [0, 3, 15]:
+        expected = compute_average_power(raw_session['headset'][channel], FEATURES['alpha_wave']['start_frequency'],
+                                         FEATURES['alpha_wave']['end_frequency'])
+        assert np.isclose(prepared_session['features']['alpha'][channel], expected, rtol=1e-12)
+    for feature in ADDITIONAL_FEATURES:
+        assert len(prepared_session['features'][feature['name']]) == 22
+    headset = np.asarray(raw_session['headset'][15])
+    assert np.isclose(prepared_session['features']['hjorth_mobility'][15],
+                      np.sqrt(np.var(np.diff(headset)) / np.var(headset)))
+
+    execution_session = {}
+    FeaturesExtractor().extract_features(FEATURES, raw_session, execution_session, 'execution')
+    assert len(execution_session['features']) == 22 * 4 + 1
+
+
+# ===================== CONFIGURATION SCHEMA TEST ===================== #
+
+@pytest.mark.parametrize('feature, valid', [
+    ({'name': 'relative_alpha', 'type': 'relative_power', 'band': 'alpha_wave'}, True),
+    ({'name': 'relative_alpha', 'type': 'relative_power'}, False),
+    ({'name': 'ratio', 'type': 'band_ratio', 'numerator': 'alpha_wave', 'denominator': 'beta_wave'}, True),
+    ({'name': 'ratio', 'type': 'band_ratio', 'numerator': 'alpha_wave'}, False),
+    ({'name': 'mobility', 'type': 'hjorth_mobility'}, True),
+    ({'name': 'alpha', 'type': 'band_power', 'band': 'beta_wave'}, False),
+    ({'name': 'environment', 'type': 'spectral_entropy'}, False)
+])
+def test_additional_features_schema(feature, valid):
+    with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data',
+                           'configuration_schema.json')) as f:
+        configuration_schema = json.load(f)
+    with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'preparation_system_configuration.json')) as f:
+        configuration = json.load(f)
+    configuration['features']['additional_features'] = [feature]
+    try:
+        validate(configuration, configuration_schema)
+        assert valid
+    except ValidationError:
+        assert not valid
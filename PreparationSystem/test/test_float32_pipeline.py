@@ -0,0 +1,89 @@
+import copy
+import random
+
+import numpy as np
+
+from src.session_cleaning import SessionCleaning
+from src.features_extractor import FeaturesExtractor
+
+FEATURES = {
+    'delta_wave': {'start_frequency': 0.5, 'end_frequency': 4},
+    'theta_wave': {'start_frequency': 4, 'end_frequency': 8},
+    'alpha_wave': {'start_frequency': 8, 'end_frequency': 12},
+    'beta_wave': {'start_frequency': 12, 'end_frequency': 30},
+    'environment': {'indoor': 0, 'outdoor': 1}
+}
+
+# maximum relative error accepted between the float32 and the float64 band powers
+RELATIVE_TOLERANCE = 1e-6
+
+
+def generate_raw_session(missing_channels=(), number_of_samples=1375, seed=0):
+    rng = random.Random(seed)
+    headset = []
+    for channel in range(22):
+        if channel in missing_channels:
+            headset.append([])
+        else:
+            headset.append([rng.gauss(0, 8) for _ in range(number_of_samples)])
+    return {
+        'uuid': 'a923-45b7-gh12-7408003775.0',
+        'calendar': 'home',
+        'command_thought': 'move',
+        'environment': 'indoor',
+        'headset': headset
+    }
+
+
+def prepare(raw_session, float32_pipeline, operative_mode='development'):
+    if float32_pipeline:
+        raw_session['headset'] = SessionCleaning.headset_to_array(raw_session['headset'])
+    assert SessionCleaning().correct_missing_samples(raw_session['headset'])
+    SessionCleaning.correct_outliers(raw_session['headset'], -15, 15)
+    prepared_session = {}
+    FeaturesExtractor().extract_features(FEATURES, raw_session, prepared_session, operative_mode)
+    return prepared_session
+
+
+# ===================== FLOAT32 VS FLOAT64 TEST ===================== #
+
+def test_headset_to_array():
+    raw_session = generate_raw_session(missing_channels=(8,))
+    headset = SessionCleaning.headset_to_array(raw_session['headset'])
+    assert headset.dtype == np.float32
+    assert headset.shape == (22, 1375)
+    assert headset.flags['C_CONTIGUOUS']
+    assert np.isnan(headset[8]).all()
+
+
+def test_headset_to_array_different_lengths():
+    raw_session = generate_raw_session()
+    raw_session['headset'][3].pop()
+    assert SessionCleaning.headset_to_array(raw_session['headset']) is None
+
+
+def test_float32_development_session():
+    raw_session = generate_raw_session(missing_channels=(7, 8, 11))
+    expected = prepare(copy.deepcopy(raw_session), float32_pipeline=False)
+    prepared = prepare(raw_session, float32_pipeline=True)
+
+    for band in ['delta', 'theta', 'alpha', 'beta']:
+        assert len(prepared['features'][band]) == 22
+        assert np.allclose(prepared['features'][band], expected['features'][band], rtol=RELATIVE_TOLERANCE, atol=0)
+    assert prepared['features']['environment'] == expected['features']['environment']
+
+
+def test_float32_execution_session():
+    raw_session = generate_raw_session(number_of_samples=1000, seed=1)
+    expected = prepare(copy.deepcopy(raw_session), float32_pipeline=False, operative_mode='execution')
+    prepared = prepare(raw_session, float32_pipeline=True, operative_mode='execution')
+
+    assert len(prepared['features']) == 22 * 4 + 1
+    assert all(isinstance(value, float) for value in prepared['features'][:-1])
+    assert np.allclose(prepared['features'], expected['features'], rtol=RELATIVE_TOLERANCE, atol=0)
+
+
+def test_float32_unrecoverable_session():
+    raw_session = generate_raw_session(missing_channels=(2,))
+    headset = SessionCleaning.headset_to_array(raw_session['headset'])
+    assert not SessionCleaning().correct_missing_samples(headset)
@@ -0,0 +1,64 @@
+import json
+import os
+
+import numpy as np
+
+from src.json_io import JsonIO, app
+from src.session_cleaning import SessionCleaning
+from test.test_float32_pipeline import generate_raw_session
+
+
+# ===================== HEADSET DECODING TEST ===================== #
+
+def test_decode_headset_as_lists():
+    JsonIO.get_instance().set_headset_dtype(None)
+    raw_session = generate_raw_session(number_of_samples=10)
+    received_json = JsonIO.get_instance().decode(json.dumps(raw_session).encode())
+    assert received_json == raw_session
+
+
+def test_decode_headset_as_array():
+    JsonIO.get_instance().set_headset_dtype(np.float32)
+    raw_session = generate_raw_session(missing_channels=(9,), number_of_samples=10)
+    received_json = JsonIO.get_instance().decode(json.dumps(raw_session).encode())
+    JsonIO.get_instance().set_headset_dtype(None)
+
+    assert received_json['uuid'] == raw_session['uuid']
+    assert received_json['headset'].dtype == np.float32
+    assert received_json['headset'].shape == (22, 10)
+    assert np.isnan(received_json['headset'][9]).all()
+    assert np.allclose(received_json['headset'][0], raw_session['headset'][0])
+
+
+def test_decode_malformed_headset():
+    JsonIO.get_instance().set_headset_dtype(np.float32)
+    raw_session = generate_raw_session(number_of_samples=10)
+    raw_session['headset'][0][0] = 'not a sample'
+    received_json = JsonIO.get_instance().decode(json.dumps(raw_session).encode())
+    JsonIO.get_instance().set_headset_dtype(None)
+    assert isinstance(received_json['headset'], list)
+
+
+def test_post_invalid_json():
+    response = app.test_client().post('/json', data=b'{not json')
+    assert response.status_code == 500
+
+
+# ===================== ARRAY VALIDATION TEST ===================== #
+
+def test_validate_headset_array(monkeypatch):
+    # the schema is loaded from '../data'
+    monkeypatch.chdir(os.path.dirname(__file__))
+    raw_session = generate_raw_session(number_of_samples=10)
+    raw_session['headset'] = SessionCleaning.headset_to_array(raw_session['headset'])
+    assert SessionCleaning.validate_raw_session(raw_session)
+
+    raw_session['headset'] = raw_session['headset'][:21]
+    assert not SessionCleaning.validate_raw_session(raw_session)
+
+    raw_session['headset'] = np.zeros((22, 1376), dtype=np.float32)
+    assert not SessionCleaning.validate_raw_session(raw_session)
+
+    raw_session['headset'] = np.zeros((22, 10), dtype=np.float32)
+    raw_session['environment'] = 'underwater'
+    assert not SessionCleaning.validate_raw_session(raw_session)
@@ -0,0 +1,113 @@
+import os
+import pstats
+import signal
+import tracemalloc
+from threading import Thread
+
+from src.json_io import JsonIO, app
+from src.stage_profiler import StageProfiler
+
+
+def run_sessions(profiler, sessions):
+    for _ in range(sessions):
+        with profiler.session():
+            with profiler.stage('validate'):
+                pass
+            with profiler.stage('extract_features'):
+                [0.0] * 10000
+
+
+def change_directory(monkeypatch, tmp_path):
+    # the profiler writes in '../data'
+    os.makedirs(tmp_path / 'data')
+    os.makedirs(tmp_path / 'src')
+    monkeypatch.chdir(tmp_path / 'src')
+
+
+# ===================== RING BUFFER TEST ===================== #
+
+def test_disabled_profiler():
+    profiler = StageProfiler()
+    run_sessions(profiler, 3)
+    assert not profiler.is_enabled()
+    assert profiler.get_report()['records'] == []
+
+
+def test_ring_buffer():
+    profiler = StageProfiler({'enabled': True, 'ring_buffer_size': 6})
+    run_sessions(profiler, 5)
+    report = profiler.get_report()
+
+    assert report['sessions'] == 5
+    assert len(report['records']) == 6
+    assert report['records'][0]['session'] == 3
+    assert report['stages']['validate']['count'] == 3
+    assert report['stages']['extract_features']['p99_wall_time_ms'] >= 0
+    assert report['records'][0]['allocated_bytes'] is None
+
+
+def test_trace_allocations():
+    profiler = StageProfiler({'enabled': True, 'trace_allocations': True})
+    run_sessions(profiler, 2)
+    tracemalloc.stop()
+    report = profiler.get_report()
+    # the list of 10000 floats allocates about 80 kB
+    assert report['stages']['extract_features']['max_allocated_bytes'] > 70000
+
+
+# ===================== DUMP TEST ===================== #
+
+def test_dump_report(monkeypatch, tmp_path):
+    change_directory(monkeypatch, tmp_path)
+    profiler = StageProfiler({'enabled': True})
+    run_sessions(profiler, 2)
+    profiler.dump_report()
+    assert os.path.exists(tmp_path / 'data' / 'profiling_report.json')
+
+
+def test_signal_during_stage(monkeypatch, tmp_path):
+    change_directory(monkeypatch, tmp_path)
+    profiler = StageProfiler({'enabled': True})
+    run_sessions(profiler, 1)
+
+    def signal_while_recording():
+        # the handler runs on the thread that is appending the record of a stage
+        with profiler._lock:
+            signal.getsignal(signal.SIGUSR1)(signal.SIGUSR1, None)
+
+    thread = Thread(target=signal_while_recording, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert os.path.exists(tmp_path / 'data' / 'profiling_report.json')
+
+
+def test_profiling_endpoint():
+    JsonIO.get_instance().set_profiler(None)
+    assert app.test_client().get('/profiling').status_code == 404
+
+    profiler = StageProfiler({'enabled': True})
+    run_sessions(profiler, 2)
+    JsonIO.get_instance().set_profiler(profiler)
+    response = app.test_client().get('/profiling')
+    JsonIO.get_instance().set_profiler(None)
+    assert response.status_code == 200
+    assert response.json['stages']['validate']['count'] == 2
+
+
+def test_cprofile_capture(monkeypatch, tmp_path):
+    change_directory(monkeypatch, tmp_path)
+    profiler = StageProfiler({'enabled': True, 'capture_mode': 'cprofile', 'capture_sessions': 2})
+    # the capture is saved when the last captured session is completed
+    run_sessions(profiler, 2)
+    stats = pstats.Stats(str(tmp_path / 'data' / 'profiling_capture.prof'))
+    assert stats.total_calls > 0
+
+
+def test_tracemalloc_capture(monkeypatch, tmp_path):
+    change_directory(monkeypatch, tmp_path)
+    profiler = StageProfiler({'enabled': True, 'capture_mode': 'tracemalloc', 'capture_sessions': 2})
+    run_sessions(profiler, 1)
+    assert not os.path.exists(tmp_path / 'data' / 'profiling_capture.txt')
+    run_sessions(profiler, 1)
+    assert os.path.getsize(tmp_path / 'data' / 'profiling_capture.txt') > 0
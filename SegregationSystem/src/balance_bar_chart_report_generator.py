@@ -1,41 +1,27 @@
 import os
 import json
 from jsonschema import validate, ValidationError
-import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import random
 import utility.logging as log
 
 
 class BalanceBarChartReportGenerator:
 
+    # worker that renders the bar charts off the main loop, shared by all the generators
+    _executor = None
+    _pending_chart = None
+
     def __init__(self):
         pass
 
-    def generate_balance_bar_chart(self, dataset):
+    def generate_balance_bar_chart(self, counts, background=False):
 
+        # the occurrences of each command thought are kept up to date by the PreparedSessionCollector
         labels = ['move', 'left', 'right', 'stop']
-        values = [0, 0, 0, 0]
-
-        # prepare data to build the bar chart
-        for p_session in dataset:
-            ct = p_session['command_thought']
-            index = None
-            if ct == 'move':
-                index = 0
-            elif ct == 'left':
-                index = 1
-            elif ct == 'right':
-                index = 2
-            elif ct == 'stop':
-                index = 3
-
-            values[index] += 1
-
-        plt.bar(labels, values, width=0.4, align='center')
-        plt.xlabel('Commands Thought')
-        plt.ylabel('Number of Occurrences')
-        plt.title(f'Histogram of Commands Thought')
-        plt.grid(True)
+        values = [counts[label] for label in labels]
 
         # save data just calculated in a dict
         info = dict()
@@ -44,16 +30,55 @@ class BalanceBarChartReportGenerator:
         info['right'] = values[2]
         info['stop'] = values[3]
 
-        # save bar chart in a png image
         chart_path = os.path.join(os.path.abspath('..'), 'data', 'balancing', 'balance_bar_chart.png')
+
+        # the report only needs the info, so the bar chart can be rendered by the worker
+        if background:
+            if BalanceBarChartReportGenerator._executor is None:
+                BalanceBarChartReportGenerator._executor = ThreadPoolExecutor(max_workers=1)
+            BalanceBarChartReportGenerator._pending_chart = BalanceBarChartReportGenerator._executor.submit(
+                self._render_balance_bar_chart, labels, values, chart_path)
+            return info
+
+        if not self._render_balance_bar_chart(labels, values, chart_path):
+            return None
+        return info
+
+    @staticmethod
+    def _render_balance_bar_chart(labels, values, chart_path):
+
+        # draw on a figure of its own (not on the pyplot global state) with the non-GUI Agg canvas,
+        # so that nothing is left behind between the collection cycles
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.bar(labels, values, width=0.4, align='center')
+        ax.set_xlabel('Commands Thought')
+        ax.set_ylabel('Number of Occurrences')
+        ax.set_title(f'Histogram of Commands Thought')
+        ax.grid(True)
+
+        # save bar chart in a png image
         try:
-            plt.savefig(chart_path)
+            fig.savefig(chart_path)
         except:
             log.error('Failure to save the balance bar chart')
-            return None
+            return False
+        finally:
+            fig.clear()
 
         log.success('Balance bar chart generated')
-        return info
+        return True
+
+    @staticmethod
+    def wait_balance_bar_chart():
+
+        # wait for the bar chart rendered by the worker (if any)
+        if BalanceBarChartReportGenerator._pending_chart is None:
+            return True
+        res = BalanceBarChartReportGenerator._pending_chart.result()
+        BalanceBarChartReportGenerator._pending_chart = None
+        return res
 
     def generate_balancing_report(self, info, testing_mode):
 
@@ -1,6 +1,7 @@
 from flask import Flask, request
 from requests import post, exceptions
 import queue
+import time
 import utility.logging as log
 
 
@@ -32,6 +33,22 @@ class JsonIO:
         # if the queue is empty the thread is blocked
         return self._received_json_queue.get(block=True)
 
+    def receive_batch(self, max_size, timeout):
+        # wait for a json message, then drain the queue until max_size messages
+        # are collected or timeout seconds have passed
+        batch = [self._received_json_queue.get(block=True)]
+        deadline = time.monotonic() + timeout
+        while len(batch) < max_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._received_json_queue.get(block=True, timeout=remaining))
+                else:
+                    batch.append(self._received_json_queue.get(block=False))
+            except queue.Empty:
+                break
+        return batch
+
     def put_json_into_queue(self, received_json):
         # save received message into queue
         self._received_json_queue.put(received_json)
@@ -45,6 +62,22 @@ class JsonIO:
             log.error("Endpoint system unreachable")
             return False
 
+        return self._check_response(response)
+
+    def send_columnar_dataset(self, ip, port, payload):
+        # send the compressed columnar dataset as a binary body
+        connection_string = f'http://{ip}:{port}/dataset'
+        response = None
+        try:
+            response = post(connection_string, data=payload, headers={'Content-Type': 'application/octet-stream'})
+        except exceptions.RequestException:
+            log.error("Endpoint system unreachable")
+            return False
+
+        return self._check_response(response)
+
+    @staticmethod
+    def _check_response(response):
         if response.status_code != 200:
             res = response.json()
             error_message = 'unknown'
@@ -0,0 +1,70 @@
+import io
+import numpy as np
+
+# order of the bands in the features array (and in the packed features of the database)
+BANDS = ['alpha', 'beta', 'delta', 'theta']
+CHANNELS = 22
+
+
+class LearningSessionSet:
+
+    def __init__(self, uuids, calendars, environments, command_thoughts, features):
+        # scalar fields, one element per prepared session
+        self.uuids = np.asarray(uuids, dtype=object)
+        self.calendars = np.asarray(calendars, dtype=object)
+        self.environments = np.asarray(environments, dtype=object)
+        self.command_thoughts = np.asarray(command_thoughts, dtype=object)
+        # band powers as a (sessions x bands x channels) float32 array
+        self.features = np.asarray(features, dtype=np.float32).reshape(-1, len(BANDS), CHANNELS)
+
+    def __len__(self):
+        return len(self.uuids)
+
+    @staticmethod
+    def pack_features(p_session):
+        # convert the band powers of a prepared session in the blob stored in the database
+        features = p_session['features']
+        return np.array([features[band] for band in BANDS], dtype=np.float32).tobytes()
+
+    @staticmethod
+    def from_rows(rows):
+        # build the set from the (uuid, calendar, environment, command_thought, features) database rows,
+        # the features blobs are decoded all at once
+        if len(rows) == 0:
+            return LearningSessionSet([], [], [], [], np.empty((0, len(BANDS), CHANNELS), dtype=np.float32))
+        uuids, calendars, environments, command_thoughts, blobs = zip(*rows)
+        features = np.frombuffer(b''.join(blobs), dtype=np.float32)
+        return LearningSessionSet(uuids, calendars, environments, command_thoughts, features)
+
+    def get_band(self, band):
+        # (sessions x channels) view of the powers of a band
+        return self.features[:, BANDS.index(band), :]
+
+    def to_sessions(self, indices=None):
+        # materialize the prepared sessions (as received) of the given indices, all of them if None
+        if indices is None:
+            indices = range(len(self))
+
+        sessions = []
+        for i in indices:
+            session_features = {band: self.features[i, b].tolist() for b, band in enumerate(BANDS)}
+            session_features['environment'] = self.environments[i]
+            sessions.append({
+                'uuid': self.uuids[i],
+                'features': session_features,
+                'calendar': self.calendars[i],
+                'command_thought': self.command_thoughts[i]
+            })
+        return sessions
+
+    def to_columnar_payload(self, splits):
+        # compressed npz with the columns of the sessions of each split (name -> indices), the features keep
+        # the float32 (sessions x bands x channels) layout, calendar and uuid are not needed by the receiver
+        columns = {}
+        for name, indices in splits.items():
+            columns[f'{name}_features'] = self.features[indices]
+            columns[f'{name}_environments'] = self.environments[indices].astype(str)
+            columns[f'{name}_command_thoughts'] = self.command_thoughts[indices].astype(str)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **columns)
+        return buffer.getvalue()
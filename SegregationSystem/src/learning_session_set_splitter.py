@@ -1,7 +1,8 @@
-from sklearn.model_selection import train_test_split
-import math
+import numpy as np
 import utility.logging as log
 
+SETS = ['training', 'validation', 'testing']
+
 
 class LearningSessionSetSplitter:
 
@@ -9,23 +10,42 @@ class LearningSessionSetSplitter:
         self.segregation_system_config = config
 
     def generate_training_validation_testing_set(self, dataset):
-        # train_test_split function can split the dataset only in two part, so it's needed to execute it
-        # again to obtain three sets
-        training_size = self.segregation_system_config['training_set_size']
-        validation_size = self.segregation_system_config['validation_set_size']
-        testing_size = self.segregation_system_config['testing_set_size']
-
-        testing_size = math.floor((testing_size / (1 - training_size)) * 100) / 100
-        validation_size = (100 - testing_size * 100) / 100
-
-        training, res = train_test_split(dataset, train_size=training_size)
-
-        if testing_size > validation_size:
-            testing, validation = train_test_split(res, train_size=testing_size)
-        else:
-            validation, testing = train_test_split(res, train_size=validation_size)
-
-        log.info(f"training_size: {len(training)} validation_size: {len(validation)} testing_size: {len(testing)}")
-
-        # return the final dataset composed by the splitted dataset
-        return {'training': training, 'validation': validation, 'testing': testing}
\ No newline at end of file
+        # the dataset is split by indexes, stratified by command thought: the sessions of each command thought
+        # are shuffled and divided among the three sets with the configured proportions
+        sizes = np.array([self.segregation_system_config['training_set_size'],
+                          self.segregation_system_config['validation_set_size'],
+                          self.segregation_system_config['testing_set_size']])
+        sizes = sizes / sizes.sum()
+        rng = np.random.default_rng(self.segregation_system_config.get('split_seed'))
+
+        parts = {name: [] for name in SETS}
+        for command_thought in np.unique(dataset.command_thoughts):
+            indexes = np.flatnonzero(dataset.command_thoughts == command_thought)
+            rng.shuffle(indexes)
+            bounds = np.cumsum(self._split_counts(len(indexes), sizes))[:-1]
+            for name, part in zip(SETS, np.split(indexes, bounds)):
+                parts[name].append(part)
+
+        # indexes of the sessions of each set (in random order), the sessions are materialized only when sent
+        splitted_dataset = {name: rng.permutation(np.concatenate(parts[name])) if parts[name]
+                            else np.empty(0, dtype=np.int64) for name in SETS}
+
+        log.info(f"training_size: {len(splitted_dataset['training'])} "
+                 f"validation_size: {len(splitted_dataset['validation'])} "
+                 f"testing_size: {len(splitted_dataset['testing'])}")
+        return splitted_dataset
+
+    @staticmethod
+    def _split_counts(sessions, sizes):
+        # number of sessions of each set (largest remainder rounding)
+        exact = sessions * sizes
+        counts = np.floor(exact).astype(int)
+        for i in np.argsort(counts - exact, kind='stable')[:sessions - counts.sum()]:
+            counts[i] += 1
+
+        # a rare command thought has to be present in every set (if it has enough sessions)
+        if sessions >= len(sizes):
+            for i in np.flatnonzero((counts == 0) & (sizes > 0)):
+                counts[np.argmax(counts)] -= 1
+                counts[i] += 1
+        return counts
@@ -1,41 +1,190 @@
 import sqlite3
 import os
 import json
-from jsonschema import validate, ValidationError
+import numpy as np
+from jsonschema import ValidationError
+from jsonschema.validators import validator_for
+from src.learning_session_set import LearningSessionSet, BANDS, CHANNELS
+from src.session_statistics import SessionStatistics
 import utility.logging as log
 
 
 class PreparedSessionCollector:
 
+    # p_session schema validator, compiled once
+    _p_session_validator = None
+
     def __init__(self, config):
         self.segregation_system_config = config
         self._prepared_session_counter = 0
+        self._statistics = None
 
         db_name = config['db_name']
         db_path = os.path.join(os.path.abspath('..'), 'data', db_name)
-        if not os.path.exists(db_path):
-            log.error("Sqlite db doesn't exist")
-            exit(1)
         try:
             self._conn = sqlite3.connect(db_path)
+            # write ahead log: the stores append to the log instead of rewriting the database pages
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._create_table()
         except sqlite3.Error as e:
             log.error(f'[-] Sqlite Connection Error [{e}]')
             exit(1)
 
-    def _validate_prepared_session(self, p_session):
+    def _create_table(self):
+
+        # the prepared sessions are stored in columns: the scalar fields have their own column and the 88 band
+        # powers are packed in a float32 blob (alpha, beta, delta, theta)
+        cursor = self._conn.cursor()
+        cursor.execute("PRAGMA table_info(p_session)")
+        columns = [column[1] for column in cursor.fetchall()]
+        if 'json' in columns:
+            self._migrate_json_table()
+        elif len(columns) > 0 and not self._is_clustered():
+            self._migrate_rowid_table()
+
+        self._create_schema(cursor)
+        self._conn.commit()
+
+    @staticmethod
+    def _create_schema(cursor):
+
+        # the table is clustered on the (user_id, session_id) key: the sessions of an user are stored contiguously
+        # in session order, so a new session is appended at the end of its user and the counter lookup and the
+        # learning session set loading are range scans of the key. Command thought and environment are never
+        # searched, they aren't indexed to not slow down the stores
+        cursor.execute("CREATE TABLE IF NOT EXISTS p_session ( \
+                            user_id integer, \
+                            session_id integer, \
+                            uuid text, \
+                            calendar text, \
+                            environment text, \
+                            command_thought text, \
+                            features blob, \
+                            primary key(user_id, session_id) \
+                        ) WITHOUT ROWID")
+        cursor.execute("CREATE INDEX IF NOT EXISTS p_session_uuid ON p_session (uuid)")
 
-        schema_path = os.path.join(os.path.abspath('..'), 'schemas', 'p_session_schema.json')
+        # running statistics of the learning session set of each user, updated at each store
+        cursor.execute("CREATE TABLE IF NOT EXISTS p_session_statistics ( \
+                            user_id integer primary key, \
+                            threshold integer, \
+                            sessions integer, \
+                            move integer, \
+                            left integer, \
+                            right integer, \
+                            stop integer, \
+                            mean blob, \
+                            m2 blob \
+                        )")
+
+    def _migrate_json_table(self):
+
+        # convert a database with the prepared sessions stored as json text to the columnar layout, in a single
+        # transaction: on failure the json table is left as it was
+        log.warning("Migrating p_session table to the columnar layout")
+        cursor = self._conn.cursor()
+        cursor.execute("BEGIN")
         try:
+            cursor.execute("ALTER TABLE p_session RENAME TO p_session_json")
+            self._create_schema(cursor)
+            cursor.execute("SELECT user_id, session_id, json FROM p_session_json")
+            rows = []
+            for user_id, session_id, p_session in cursor.fetchall():
+                p_session = json.loads(p_session)
+                rows.append((user_id, session_id, p_session['uuid'], p_session['calendar'],
+                             p_session['features']['environment'], p_session['command_thought'],
+                             LearningSessionSet.pack_features(p_session)))
+            cursor.executemany("INSERT INTO p_session VALUES(?, ?, ?, ?, ?, ?, ?)", rows)
+            cursor.execute("DROP TABLE p_session_json")
+            self._conn.commit()
+        except Exception:
+            self._conn.rollback()
+            log.error("Migration of the p_session table failed, the table is unchanged")
+            raise
 
-            with open(schema_path) as file:
-                p_session_schema = json.load(file)
+    def _is_clustered(self):
+        cursor = self._conn.cursor()
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'p_session'")
+        return 'WITHOUT ROWID' in cursor.fetchone()[0].upper()
 
-            validate(p_session, p_session_schema)
+    def _migrate_rowid_table(self):
 
-        except FileNotFoundError:
-            log.error('Failure to open p_session_schema.json')
-            return False
+        # rebuild a columnar p_session table created with the rowid layout as a clustered table, in a single
+        # transaction: on failure the rowid table is left as it was
+        log.warning("Migrating p_session table to the clustered layout")
+        cursor = self._conn.cursor()
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute("DROP INDEX IF EXISTS p_session_uuid")
+            cursor.execute("ALTER TABLE p_session RENAME TO p_session_rowid")
+            self._create_schema(cursor)
+            cursor.execute("INSERT INTO p_session SELECT user_id, session_id, uuid, calendar, environment, \
+                                command_thought, features FROM p_session_rowid ORDER BY user_id, session_id")
+            cursor.execute("DROP TABLE p_session_rowid")
+            self._conn.commit()
+        except Exception:
+            self._conn.rollback()
+            log.error("Migration of the p_session table failed, the table is unchanged")
+            raise
+
+    def _apply_retention_policy(self):
+
+        # the sessions of the old users are never loaded again: only the most recent retained_users users
+        # (the actual one included) are kept, the others are deleted ('prune') or moved to the archive database
+        # ('archive')
+        retention_policy = self.segregation_system_config.get('retention_policy', {'mode': 'none'})
+        if retention_policy['mode'] == 'none':
+            return
+        user_id = self.segregation_system_config['user_id']
+        retained_users = retention_policy.get('retained_users', 1)
+
+        cursor = self._conn.cursor()
+        try:
+            cursor.execute("SELECT DISTINCT user_id FROM p_session WHERE user_id != ? ORDER BY user_id DESC",
+                           (user_id,))
+            old_users = [res[0] for res in cursor.fetchall()][retained_users - 1:]
+            if len(old_users) == 0:
+                return
+
+            placeholders = ', '.join('?' * len(old_users))
+            archive = retention_policy['mode'] == 'archive'
+            if archive:
+                archive_db_name = retention_policy.get('archive_db_name', 'segregation_archive.db')
+                archive_db_path = os.path.join(os.path.abspath('..'), 'data', archive_db_name)
+                cursor.execute("ATTACH DATABASE ? AS archive", (archive_db_path,))
+                cursor.execute("CREATE TABLE IF NOT EXISTS archive.p_session AS SELECT * FROM p_session WHERE 0")
+                cursor.execute(f"INSERT INTO archive.p_session SELECT * FROM p_session \
+                                    WHERE user_id IN ({placeholders})", old_users)
+
+            # the sessions are archived and deleted in the same transaction
+            cursor.execute(f"DELETE FROM p_session WHERE user_id IN ({placeholders})", old_users)
+            cursor.execute(f"DELETE FROM p_session_statistics WHERE user_id IN ({placeholders})", old_users)
+            self._conn.commit()
+            if archive:
+                cursor.execute("DETACH DATABASE archive")
+        except sqlite3.Error as e:
+            log.error(f'Sqlite Execution Error [{e}]')
+            self._conn.rollback()
+            return
+
+        log.info(f"retention policy ({retention_policy['mode']}): removed the sessions of {len(old_users)} users")
 
+    def _validate_prepared_session(self, p_session):
+
+        # the schema is loaded and compiled only the first time
+        if PreparedSessionCollector._p_session_validator is None:
+            schema_path = os.path.join(os.path.abspath('..'), 'schemas', 'p_session_schema.json')
+            try:
+                with open(schema_path) as file:
+                    p_session_schema = json.load(file)
+            except FileNotFoundError:
+                log.error('Failure to open p_session_schema.json')
+                return False
+            PreparedSessionCollector._p_session_validator = validator_for(p_session_schema)(p_session_schema)
+
+        try:
+            PreparedSessionCollector._p_session_validator.validate(p_session)
         except ValidationError:
             log.error('Prepared Session validation failed')
             return False
@@ -64,8 +213,53 @@ class PreparedSessionCollector:
 
         log.info(f"user_id: {user_id} counter: {self._prepared_session_counter}")
 
-    def increment_prepared_session_counter(self):
-        self._prepared_session_counter += 1
+        self._apply_retention_policy()
+        self._load_statistics()
+
+    def _load_statistics(self):
+
+        # load the running statistics of the actual user_id, they are rebuilt from the stored sessions
+        # if they don't exist yet or if they refer to a different collecting_threshold
+        user_id = self.segregation_system_config['user_id']
+        threshold = self.segregation_system_config['collecting_threshold']
+
+        query = "SELECT threshold, sessions, move, left, right, stop, mean, m2 FROM p_session_statistics \
+                    WHERE user_id = ?"
+        cursor = self._conn.cursor()
+        try:
+            cursor.execute(query, (user_id,))
+            res = cursor.fetchone()
+            if res is not None and res[0] == threshold:
+                self._statistics = SessionStatistics.from_row(res)
+                return
+
+            dataset = self.load_learning_session_set()
+            if dataset is None:
+                return
+            self._statistics = SessionStatistics(threshold)
+            for command_thought, features in zip(dataset.command_thoughts, dataset.features):
+                self._statistics.add(command_thought, features)
+            self._save_statistics(cursor)
+            self._conn.commit()
+        except sqlite3.Error as e:
+            log.error(f'Sqlite Execution Error [{e}]')
+            return
+
+        log.info(f"statistics rebuilt from {self._statistics.sessions} prepared sessions")
+
+    def _save_statistics(self, cursor):
+        query = "INSERT OR REPLACE INTO p_session_statistics VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        cursor.execute(query, (self.segregation_system_config['user_id'],) + self._statistics.to_row())
+
+    def get_statistics(self):
+        return self._statistics
+
+    def increment_prepared_session_counter(self, sessions=1):
+        self._prepared_session_counter += sessions
+
+    def get_missing_sessions(self):
+        # number of prepared sessions still needed to complete the learning session set
+        return max(self.segregation_system_config['collecting_threshold'] - self._prepared_session_counter, 1)
 
     def check_collecting_threshold(self):
 
@@ -82,7 +276,8 @@ class PreparedSessionCollector:
         user_id = self.segregation_system_config['user_id']
         dataset_size = self.segregation_system_config['collecting_threshold']
 
-        query = "SELECT * FROM p_session WHERE user_id = ? ORDER BY session_id DESC LIMIT ?"
+        query = "SELECT uuid, calendar, environment, command_thought, features FROM p_session \
+                    WHERE user_id = ? ORDER BY session_id DESC LIMIT ?"
         cursor = self._conn.cursor()
         try:
             cursor.execute(query, (user_id, dataset_size))
@@ -94,35 +289,72 @@ class PreparedSessionCollector:
         if res is None:
             return None
 
-        # save the learning session set as a list of prepared sessions
-        dataset = []
-        for p_session in res:
-            dataset.append(json.loads(p_session[2]))
-        return dataset
+        # save the learning session set as columns of numpy arrays
+        return LearningSessionSet.from_rows(res)
 
     def store_prepared_session(self, p_session):
+        return self.store_prepared_sessions([p_session]) == 1
+
+    def store_prepared_sessions(self, p_sessions):
 
         # all prepared sessions have to be validate before store them
-        if not self._validate_prepared_session(p_session):
-            log.error("Invalid data")
-            return False
+        valid_p_sessions = []
+        for p_session in p_sessions:
+            if self._validate_prepared_session(p_session):
+                valid_p_sessions.append(p_session)
+            else:
+                log.error("Invalid data")
+        if len(valid_p_sessions) == 0:
+            return 0
 
         # assign an user_id and session_id to a prepared_session in order to
         # distinguish different sessions and different datasets
         user_id = self.segregation_system_config['user_id']
-        session_id = self._prepared_session_counter
+        first_session_id = self._prepared_session_counter
+        rows = []
+        for session_id, p_session in enumerate(valid_p_sessions, first_session_id):
+            rows.append((user_id, session_id, p_session['uuid'], p_session['calendar'],
+                         p_session['features']['environment'], p_session['command_thought'],
+                         LearningSessionSet.pack_features(p_session)))
+
+        # store the prepared sessions to the database, with a single commit
+        query = "INSERT INTO p_session (user_id, session_id, uuid, calendar, environment, command_thought, features) \
+                        VALUES(?, ?, ?, ?, ?, ?, ?) "
+        if self._statistics is None:
+            self._load_statistics()
 
-        # store the prepared session to the database
-        query = "INSERT INTO p_session (user_id, session_id, json) \
-                        VALUES(?, ?, ?) "
         cursor = self._conn.cursor()
 
         try:
-            cursor.execute(query, (user_id, session_id, json.dumps(p_session)))
+            cursor.executemany(query, rows)
+            self._update_statistics(cursor, [(row[5], row[6]) for row in rows])
             self._conn.commit()
         except sqlite3.Error as e:
             log.error(f"[-] Sqlite Execution Error [{e}]")
-            return False
+            self._conn.rollback()
+            self._load_statistics()
+            return 0
 
-        log.success(f"stored new prepared session (user_id: {user_id} session_id: {session_id})")
-        return True
+        if len(rows) == 1:
+            log.success(f"stored new prepared session (user_id: {user_id} session_id: {first_session_id})")
+        else:
+            log.success(f"stored {len(rows)} new prepared sessions "
+                        f"(user_id: {user_id} session_id: {first_session_id}-{first_session_id + len(rows) - 1})")
+        return len(rows)
+
+    def _update_statistics(self, cursor, new_sessions):
+
+        # add the new sessions (command thought, features) to the running statistics, when the learning session
+        # set is full the oldest sessions leave it, so they are removed from the statistics
+        for command_thought, features in new_sessions:
+            self._statistics.add(command_thought,
+                                 np.frombuffer(features, dtype=np.float32).reshape(len(BANDS), CHANNELS))
+        if self._statistics.sessions > self._statistics.threshold:
+            query = "SELECT command_thought, features FROM p_session WHERE user_id = ? \
+                        ORDER BY session_id DESC LIMIT ? OFFSET ?"
+            cursor.execute(query, (self.segregation_system_config['user_id'],
+                                   self._statistics.sessions - self._statistics.threshold, self._statistics.threshold))
+            for old_command_thought, old_features in cursor.fetchall():
+                self._statistics.remove(old_command_thought,
+                                        np.frombuffer(old_features, dtype=np.float32).reshape(len(BANDS), CHANNELS))
+        self._save_statistics(cursor)
@@ -0,0 +1,74 @@
+import numpy as np
+from src.learning_session_set import BANDS
+import utility.logging as log
+
+# a band power is an outlier if its robust z-score (on the log power) exceeds this value
+OUTLIER_Z_SCORE = 3.5
+
+
+class QualityAnalyzer:
+
+    def __init__(self, config):
+        # 'quality_analysis' section of the configuration
+        self._config = config
+
+    def analyze(self, dataset):
+
+        # numeric quality scores of the learning session set, computed on the whole features array
+        features = dataset.features.astype(np.float64)
+        channel_outlier_rates = self._outlier_rates(features)
+        band_separability = self._separability(features, dataset.command_thoughts)
+        duplicate_rate = self._duplicate_rate(features)
+
+        scores = {
+            'sessions': len(dataset),
+            'outlier_rate': float(channel_outlier_rates.mean()),
+            'channel_outlier_rates': channel_outlier_rates.round(4).tolist(),
+            'separability': float(band_separability.mean()),
+            'band_separability': {band: float(band_separability[i].mean()) for i, band in enumerate(BANDS)},
+            'duplicate_rate': duplicate_rate
+        }
+        log.info(f"Quality scores: outlier rate {scores['outlier_rate']:.4f} "
+                 f"separability {scores['separability']:.4f} duplicate rate {duplicate_rate:.4f}")
+        return scores
+
+    def is_accepted(self, scores):
+
+        # the dataset is accepted without the human evaluation only if every score satisfies its threshold
+        if not self._config.get('auto_accept', False):
+            return False
+        return scores['outlier_rate'] <= self._config.get('max_outlier_rate', 0.05) and \
+            scores['separability'] >= self._config.get('min_separability', 0.0) and \
+            scores['duplicate_rate'] <= self._config.get('max_duplicate_rate', 0.0)
+
+    @staticmethod
+    def _outlier_rates(features):
+
+        # fraction of sessions of each channel with at least an outlier band power (median and MAD of each
+        # band and channel), the log compresses the skewed distribution of the powers
+        log_features = np.log1p(np.maximum(features, 0))
+        median = np.median(log_features, axis=0)
+        mad = np.median(np.abs(log_features - median), axis=0)
+        z_scores = 0.6745 * np.abs(log_features - median) / np.where(mad > 0, mad, np.inf)
+        return (z_scores > OUTLIER_Z_SCORE).any(axis=1).mean(axis=0)
+
+    @staticmethod
+    def _separability(features, command_thoughts):
+
+        # Fisher score of each band power: variance between the command thoughts over variance within them
+        _, labels, counts = np.unique(command_thoughts.astype(str), return_inverse=True, return_counts=True)
+        if len(counts) < 2:
+            return np.zeros(features.shape[1:])
+        one_hot = np.eye(len(counts))[labels]
+        class_means = (one_hot.T @ features.reshape(len(features), -1)) / counts[:, None]
+        between = counts @ (class_means - features.reshape(len(features), -1).mean(axis=0)) ** 2
+        within = ((features.reshape(len(features), -1) - class_means[labels]) ** 2).sum(axis=0)
+        return (between / np.where(within > 0, within, np.inf)).reshape(features.shape[1:])
+
+    @staticmethod
+    def _duplicate_rate(features):
+        # fraction of sessions with the same band powers of a previous one
+        if len(features) == 0:
+            return 0.0
+        unique_sessions = np.unique(features.reshape(len(features), -1), axis=0)
+        return (len(features) - len(unique_sessions)) / len(features)
@@ -1,10 +1,12 @@
 import plotly.io as pio
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import os
 import json
 from jsonschema import validate, ValidationError
 import random
-from PIL import Image
+import numpy as np
+from src.learning_session_set import BANDS
 import utility.logging as log
 
 class RadarDiagramQualityReportGenerator:
@@ -12,74 +14,93 @@ class RadarDiagramQualityReportGenerator:
     def __init__(self):
         pass
 
-    def generate_radar_diagram(self, dataset):
+    def generate_radar_diagram(self, dataset=None, statistics=None, mode='summary'):
 
-        # create and save radar diagram for each eeg band (alpha, beta, delta, theta) using data into dataset.
-        channels = len(dataset[0]['features']['alpha'])
+        # draw the radar diagrams of the four eeg bands (alpha, beta, delta, theta) in one 2x2 figure:
+        # - summary: mean +/- standard deviation envelope of the running statistics
+        # - percentiles: summary plus the 10-90 and 25-75 percentile bands of the dataset
+        # - sessions: the band powers of every session of the dataset
+        channels = statistics.mean.shape[1] if statistics is not None else dataset.features.shape[2]
         labels = [f'ch{i + 1}' for i in range(channels)]
-        bands = ['alpha', 'beta', 'delta', 'theta']
         titles = ['Alpha Radar Diagram', 'Beta Radar Diagram', 'Delta Radar Diagram', 'Theta Radar Diagram']
-        file_names = ['alpha_radar_diagram.png', 'beta_radar_diagram.png', 'delta_radar_diagram.png', 'theta_radar_diagram.png']
-
-        i = 0
-        for _ in bands:
-            band = bands[i]
-            title = titles[i]
-            file_name = file_names[i]
-            fig = go.Figure()
-            for session in dataset:
-                fig.add_trace(go.Scatterpolar(
-                    r=session['features'][band],
-                    theta=labels,
-                    fill='toself',
-                    # mode='markers',
-                    name=f"uuid: {session['uuid']} ",
-                ))
-
-            fig.update_layout(showlegend=False, title=title)
-
-            file_path = os.path.join(os.path.abspath('..'), 'data', 'quality', file_name)
-            try:
-                pio.write_image(fig, file_path)
-            except:
-                log.error(f'Failure to save {file_name}')
-                return False
-            log.success(f'{title} generated')
-
-            i += 1
-
-        # create one image composed of all previously created radar diagrams
-        alpha_image = Image.open(os.path.join(os.path.abspath('..'), 'data', 'quality', file_names[0]))
-        beta_image = Image.open(os.path.join(os.path.abspath('..'), 'data', 'quality', file_names[1]))
-        delta_image = Image.open(os.path.join(os.path.abspath('..'), 'data', 'quality', file_names[2]))
-        theta_image = Image.open(os.path.join(os.path.abspath('..'), 'data', 'quality', file_names[3]))
-
-        image = Image.new("RGB", (
-            alpha_image.width + beta_image.width, alpha_image.height + delta_image.height))
-        image.paste(alpha_image, (0, 0))
-        image.paste(beta_image, (alpha_image.width, 0))
-        image.paste(delta_image, (0, alpha_image.height))
-        image.paste(theta_image, (alpha_image.width, alpha_image.height))
-
-        image.save(os.path.join(os.path.abspath('..'), 'data', 'quality', "radar_diagram.png"))
-
-        # remove the radar diagrams used to compose the last image
-        for file_name in file_names:
-            os.remove(os.path.join(os.path.abspath('..'), 'data', 'quality', file_name))
 
-        return True
+        fig = make_subplots(rows=2, cols=2, specs=[[{'type': 'polar'}] * 2] * 2, subplot_titles=titles)
+        for i, band in enumerate(BANDS):
+            if mode == 'sessions':
+                traces = self._sessions_traces(dataset.get_band(band), labels)
+            else:
+                traces = self._summary_traces(statistics.mean[i], statistics.get_std()[i], labels)
+                if mode == 'percentiles':
+                    traces = self._percentiles_traces(dataset.get_band(band), labels) + traces
+            for trace in traces:
+                fig.add_trace(trace, row=i // 2 + 1, col=i % 2 + 1)
+
+        fig.update_layout(showlegend=False, width=1400, height=1000)
+
+        # save the composed image directly
+        file_path = os.path.join(os.path.abspath('..'), 'data', 'quality', 'radar_diagram.png')
+        try:
+            pio.write_image(fig, file_path)
+        except:
+            log.error('Failure to save radar_diagram.png')
+            return False
+        log.success('Radar diagram generated')
 
-    def generate_quality_report(self, testing_mode):
+        return True
 
-        # if the testing_mode is true the human evaluation has to be simualated
+    @staticmethod
+    def _closed_polygon(outer, inner, labels):
+        # polygon of the region between two curves (outer curve, then inner curve backwards)
+        r = np.concatenate([outer, outer[:1], inner[::-1], inner[-1:]])
+        theta = labels + labels[:1] + labels[::-1] + labels[-1:]
+        return r, theta
+
+    def _summary_traces(self, mean, std, labels):
+        r, theta = self._closed_polygon(mean + std, np.maximum(mean - std, 0), labels)
+        return [
+            go.Scatterpolar(r=r, theta=theta, fill='toself', fillcolor='rgba(31, 119, 180, 0.3)',
+                            line={'width': 0}, name='mean +/- std'),
+            go.Scatterpolar(r=np.append(mean, mean[0]), theta=labels + labels[:1], line={'color': 'rgb(31, 119, 180)'},
+                            name='mean')
+        ]
+
+    def _percentiles_traces(self, band_powers, labels):
+        p10, p25, p75, p90 = np.percentile(band_powers, [10, 25, 75, 90], axis=0)
+        traces = []
+        for outer, inner, name, color in [(p90, p10, '10-90 percentiles', 'rgba(255, 127, 14, 0.15)'),
+                                          (p75, p25, '25-75 percentiles', 'rgba(255, 127, 14, 0.3)')]:
+            r, theta = self._closed_polygon(outer, inner, labels)
+            traces.append(go.Scatterpolar(r=r, theta=theta, fill='toself', fillcolor=color, line={'width': 0},
+                                          name=name))
+        return traces
+
+    @staticmethod
+    def _sessions_traces(band_powers, labels):
+        # all the sessions in one trace, each session is a closed segment separated from the next by a gap
+        sessions = len(band_powers)
+        r = np.full((sessions, len(labels) + 2), None, dtype=object)
+        r[:, :len(labels)] = band_powers
+        r[:, len(labels)] = band_powers[:, 0]
+        theta = (labels + labels[:1] + [None]) * sessions
+        return [go.Scatterpolar(r=r.ravel(), theta=theta, fill='toself', connectgaps=False, line={'width': 1},
+                                name='sessions')]
+
+    def generate_quality_report(self, testing_mode, scores=None, accepted=False):
+
+        # if the testing_mode is true the human evaluation has to be simualated, if the dataset has been
+        # accepted by the quality analyzer the human evaluation is not needed
         info = dict()
-        if testing_mode:
+        if accepted:
+            info['evaluation'] = 'good quality'
+        elif testing_mode:
             if random.randint(1, 5) == 1:
                 info['evaluation'] = 'bad quality'
             else:
                 info['evaluation'] = 'good quality'
         else:
             info['evaluation'] = ''
+        if scores is not None:
+            info['scores'] = scores
 
         # save a report with the evaluation that a human will make
         report_path = os.path.join(os.path.abspath('..'), 'data', 'quality', 'quality_report.json')
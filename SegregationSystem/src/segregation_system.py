@@ -6,6 +6,8 @@ from src.prepared_session_collector import PreparedSessionCollector
 from src.balance_bar_chart_report_generator import BalanceBarChartReportGenerator
 from src.radar_diagram_quality_report_generator import RadarDiagramQualityReportGenerator
 from src.learning_session_set_splitter import LearningSessionSetSplitter
+from src.state_journal import StateJournal
+from src.quality_analyzer import QualityAnalyzer
 from threading import Thread
 import utility.logging as log
 
@@ -14,6 +16,7 @@ class SegregationSystem:
 
     def __init__(self):
         self.segregation_system_config = None
+        self._state_journal = None
 
     def _import_config(self):
         config_path = os.path.join(os.path.abspath('..'), 'data', 'segregation_system_config.json')
@@ -40,15 +43,31 @@ class SegregationSystem:
 
         self.segregation_system_config = segregation_system_config
 
-    def _save_config(self):
-        config_path = os.path.join(os.path.abspath('..'), 'data', 'segregation_system_config.json')
+        # the state reached by the last transition is restored from the journal, unless the operator
+        # asks to restart from the state written in the configuration (reset_state_journal)
+        journal_path = os.path.join(os.path.abspath('..'), 'data', 'segregation_state.journal')
+        self._state_journal = StateJournal(journal_path)
+        reset = self.segregation_system_config.get('reset_state_journal', False)
+        self._state_journal.replay(self.segregation_system_config, reset=reset)
+        if reset:
+            log.info("State journal reset from the configuration")
+            self._clear_reset_request(config_path)
+
+    def _clear_reset_request(self, config_path):
+        # the reset is done once, the configuration is replaced atomically without the request
+        self.segregation_system_config['reset_state_journal'] = False
         try:
-            with open(config_path, "w") as file:
+            with open(config_path + '.tmp', 'w') as file:
                 json.dump(self.segregation_system_config, file, indent=4)
-        except:
-            log.error('Failure to save segregation_system_config.json')
-            return False
-        return True
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(config_path + '.tmp', config_path)
+        except OSError:
+            log.error('Failed to clear reset_state_journal in segregation_system_config.json')
+
+    def _save_state(self):
+        # the transitions are appended to the state journal instead of rewriting the configuration
+        return self._state_journal.append(self.segregation_system_config)
 
     def run(self):
 
@@ -76,42 +95,64 @@ class SegregationSystem:
 
             if op_mode == 'collecting_op_mode':
 
-                received_json = JsonIO.get_instance().receive()
+                batch_size = self.segregation_system_config.get('collecting_batch_size', 1)
+
+                if batch_size > 1:
+                    # drain the pending prepared sessions (without exceeding the learning session set)
+                    # and store them all with a single commit
+                    received_jsons = JsonIO.get_instance().receive_batch(
+                        min(batch_size, collector.get_missing_sessions()),
+                        self.segregation_system_config.get('collecting_batch_timeout', 0.5))
 
-                log.info(f"Received Json: {received_json}")
+                    log.info(f"Received {len(received_jsons)} Jsons")
+
+                    stored_sessions = collector.store_prepared_sessions(received_jsons)
+                    if stored_sessions > 0:
+                        collector.increment_prepared_session_counter(stored_sessions)
+                    else:
+                        continue
 
-                if collector.store_prepared_session(received_json):
-                    collector.increment_prepared_session_counter()
                 else:
-                    continue
+                    received_json = JsonIO.get_instance().receive()
+
+                    log.info(f"Received Json: {received_json}")
+
+                    if collector.store_prepared_session(received_json):
+                        collector.increment_prepared_session_counter()
+                    else:
+                        continue
 
                 if not collector.check_collecting_threshold():
                     continue
 
                 self.segregation_system_config['operative_mode'] = 'balancing_op_mode'
-                self._save_config()
+                self._save_state()
                 continue
 
             # ---------------- BALANCING OP MODE -----------------------
 
             elif op_mode == 'balancing_op_mode':
 
-                dataset = collector.load_learning_session_set()
-                if dataset is None:
+                # the running statistics already contain the occurrences of each command thought
+                statistics = collector.get_statistics()
+                if statistics is None:
                     log.error("Load database error")
                     continue
 
                 b_generator = BalanceBarChartReportGenerator()
-                info = b_generator.generate_balance_bar_chart(dataset)
+                info = b_generator.generate_balance_bar_chart(
+                    statistics.counts, self.segregation_system_config.get('background_chart_rendering', False))
                 # the bar chart info to build the report
                 b_generator.generate_balancing_report(info, (False if testing_mode == "off" else True))
 
                 self.segregation_system_config['operative_mode'] = 'balancing_evaluation_mode'
-                self._save_config()
+                self._save_state()
 
                 # if the system is in the testing mode, it must not shut down it because the human evaluation
                 # has been simulated
                 if self.segregation_system_config['testing_mode'] == "off":
+                    # the human evaluation needs the bar chart
+                    BalanceBarChartReportGenerator.wait_balance_bar_chart()
                     log.warning('Shutdown')
                     exit(0)
                 else:
@@ -127,19 +168,19 @@ class SegregationSystem:
                     # if the balance bar chart was evaluated with 'balanced', it's possible continue with
                     # the actual dataset
                     self.segregation_system_config['operative_mode'] = 'quality_op_mode'
-                    self._save_config()
+                    self._save_state()
                     continue
                 elif res == -1:
                     # if the balance bar chart was evaluated with 'not balanced', the dataset is not usable, so
                     # it's necessary a new configuration
                     if testing_mode == "incremental":
                         self.segregation_system_config['operative_mode'] = 'collecting_op_mode'
-                        self._save_config()
+                        self._save_state()
                         collector.retrieve_counter()
                     elif testing_mode == "normal":
                         self.segregation_system_config['operative_mode'] = 'collecting_op_mode'
                         self.segregation_system_config['user_id'] += 1
-                        self._save_config()
+                        self._save_state()
                         collector.retrieve_counter()
                     else:
                         log.warning("Reconfiguration request")
@@ -157,21 +198,41 @@ class SegregationSystem:
 
             elif op_mode == 'quality_op_mode':
 
-                dataset = collector.load_learning_session_set()
-                if dataset is None:
+                statistics = collector.get_statistics()
+                if statistics is None:
                     log.error("Load database error")
                     continue
 
+                # the summary radar diagram only needs the running statistics, the other modes and
+                # the quality analysis need the dataset
+                radar_diagram_mode = self.segregation_system_config.get('radar_diagram_mode', 'summary')
+                quality_analysis = self.segregation_system_config.get('quality_analysis', {'enabled': False})
+                dataset = None
+                if radar_diagram_mode != 'summary' or quality_analysis['enabled']:
+                    dataset = collector.load_learning_session_set()
+                    if dataset is None:
+                        log.error("Load database error")
+                        continue
+
                 q_generator = RadarDiagramQualityReportGenerator()
-                q_generator.generate_radar_diagram(dataset)
-                q_generator.generate_quality_report(False if testing_mode == "off" else True)
+                q_generator.generate_radar_diagram(dataset, statistics, radar_diagram_mode)
+
+                scores = None
+                accepted = False
+                if quality_analysis['enabled']:
+                    analyzer = QualityAnalyzer(quality_analysis)
+                    scores = analyzer.analyze(dataset)
+                    accepted = analyzer.is_accepted(scores)
+                    if accepted:
+                        log.success("Dataset automatically accepted by the quality analysis")
+                q_generator.generate_quality_report(False if testing_mode == "off" else True, scores, accepted)
 
                 self.segregation_system_config['operative_mode'] = 'quality_evaluation_mode'
-                self._save_config()
+                self._save_state()
 
-                # if the system is in the testing mode, it must not shut down it because the human evaluation
-                # has been simulated
-                if self.segregation_system_config['testing_mode'] == "off":
+                # if the system is in the testing mode or the dataset has been accepted, it must not shut down
+                # because the human evaluation has been simulated or is not needed
+                if self.segregation_system_config['testing_mode'] == "off" and not accepted:
                     log.warning('Shutdown')
                     exit(0)
                 else:
@@ -187,19 +248,19 @@ class SegregationSystem:
                     # if the radar diagram was evaluated with 'good quality', it's possible continue with
                     # the actual dataset
                     self.segregation_system_config['operative_mode'] = 'splitting_op_mode'
-                    self._save_config()
+                    self._save_state()
                     continue
                 elif res == -1:
                     # if the radar diagram was evaluated with 'bad quality', the dataset is not usable, so
                     # it's necessary a new configuration
                     if testing_mode == "incremental":
                         self.segregation_system_config['operative_mode'] = 'collecting_op_mode'
-                        self._save_config()
+                        self._save_state()
                         collector.retrieve_counter()
                     elif testing_mode == "normal":
                         self.segregation_system_config['operative_mode'] = 'collecting_op_mode'
                         self.segregation_system_config['user_id'] += 1
-                        self._save_config()
+                        self._save_state()
                         collector.retrieve_counter()
                     else:
                         log.warning("Reconfiguration request")
@@ -224,7 +285,18 @@ class SegregationSystem:
                 ip = self.segregation_system_config['endpoint_ip']
                 port = self.segregation_system_config['endpoint_port']
 
-                if JsonIO.get_instance().send(ip, port, splitted_dataset):
+                if self.segregation_system_config.get('dataset_transfer_format', 'json') == 'npz':
+                    # the three sets are sent as compressed columns
+                    payload = dataset.to_columnar_payload(splitted_dataset)
+                    log.info(f"columnar dataset size: {len(payload)} bytes")
+                    sent = JsonIO.get_instance().send_columnar_dataset(ip, port, payload)
+                else:
+                    # the sessions of the three sets are materialized only now, to be serialized
+                    splitted_dataset = {name: dataset.to_sessions(indexes)
+                                        for name, indexes in splitted_dataset.items()}
+                    sent = JsonIO.get_instance().send(ip, port, splitted_dataset)
+
+                if sent:
                     log.success("Splitted dataset successfully sent")
                 else:
                     log.error("Sending splitted dataset failed")
@@ -237,7 +309,7 @@ class SegregationSystem:
                     self.segregation_system_config['collecting_threshold'] += 30
                 else:
                     self.segregation_system_config['user_id'] += 1
-                self._save_config()
+                self._save_state()
                 collector.retrieve_counter()
 
             else:
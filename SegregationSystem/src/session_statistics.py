@@ -0,0 +1,57 @@
+import numpy as np
+from src.learning_session_set import BANDS, CHANNELS
+
+COMMANDS = ['move', 'left', 'right', 'stop']
+
+
+class SessionStatistics:
+
+    def __init__(self, threshold, sessions=0, counts=None, mean=None, m2=None):
+        # learning session set size the statistics refer to
+        self.threshold = threshold
+        self.sessions = sessions
+        # occurrences of each command thought
+        self.counts = counts if counts is not None else {command: 0 for command in COMMANDS}
+        # per band per channel running mean and sum of squared deviations (Welford)
+        self.mean = mean if mean is not None else np.zeros((len(BANDS), CHANNELS))
+        self.m2 = m2 if m2 is not None else np.zeros((len(BANDS), CHANNELS))
+
+    @staticmethod
+    def from_row(row):
+        # build the statistics from a (threshold, sessions, move, left, right, stop, mean, m2) database row
+        counts = dict(zip(COMMANDS, row[2:6]))
+        mean = np.frombuffer(row[6], dtype=np.float64).reshape(len(BANDS), CHANNELS).copy()
+        m2 = np.frombuffer(row[7], dtype=np.float64).reshape(len(BANDS), CHANNELS).copy()
+        return SessionStatistics(row[0], row[1], counts, mean, m2)
+
+    def to_row(self):
+        return (self.threshold, self.sessions) + tuple(self.counts[command] for command in COMMANDS) + \
+            (self.mean.tobytes(), self.m2.tobytes())
+
+    def add(self, command_thought, features):
+        # add a session (features is the bands x channels array of band powers)
+        self.counts[command_thought] += 1
+        self.sessions += 1
+        delta = features - self.mean
+        self.mean += delta / self.sessions
+        self.m2 += delta * (features - self.mean)
+
+    def remove(self, command_thought, features):
+        # remove a session previously added, inverting the Welford update
+        self.counts[command_thought] -= 1
+        self.sessions -= 1
+        if self.sessions == 0:
+            self.mean[:] = 0
+            self.m2[:] = 0
+            return
+        delta = features - self.mean
+        self.mean -= delta / self.sessions
+        self.m2 -= delta * (features - self.mean)
+
+    def get_variance(self):
+        if self.sessions < 2:
+            return np.zeros_like(self.m2)
+        return np.maximum(self.m2, 0) / (self.sessions - 1)
+
+    def get_std(self):
+        return np.sqrt(self.get_variance())
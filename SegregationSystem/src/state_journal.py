@@ -0,0 +1,95 @@
+import json
+import os
+import utility.logging as log
+
+# configuration fields changed by the operative mode transitions
+STATE_FIELDS = ['operative_mode', 'user_id', 'collecting_threshold']
+
+
+class StateJournal:
+
+    def __init__(self, path, max_records=1000):
+        self._path = path
+        self._max_records = max_records
+        self._records = 0
+
+    def replay(self, config, reset=False):
+
+        # the first record is the state of the configuration the journal was started from, the others are
+        # the states reached by the transitions. A record truncated by a crash during an append is ignored
+        records = []
+        if not reset:
+            try:
+                with open(self._path) as file:
+                    for line in file:
+                        try:
+                            records.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            log.warning("Ignored truncated state journal record")
+                            break
+            except FileNotFoundError:
+                pass
+
+        base = self._get_state(config)
+        if len(records) == 0 or records[0] != base:
+            # new journal, reset requested by the operator or configuration changed by hand (reconfiguration):
+            # the configuration is the new base
+            self._rewrite([base])
+            return False
+
+        config.update(records[-1])
+        self._records = len(records)
+        log.info(f"State replayed from the journal: {records[-1]}")
+        return True
+
+    def append(self, config):
+
+        # atomic append of the actual state, it's on the disk when the function returns
+        if self._records >= self._max_records and self._compact(config):
+            return True
+        try:
+            with open(self._path, 'a') as file:
+                file.write(json.dumps(self._get_state(config)) + '\n')
+                file.flush()
+                os.fsync(file.fileno())
+        except OSError:
+            log.error('Failure to append to the state journal')
+            return False
+        self._records += 1
+        return True
+
+    def _compact(self, config):
+
+        # if the compaction fails the old journal is kept and the state is appended to it
+        try:
+            with open(self._path) as file:
+                base = json.loads(file.readline())
+        except (OSError, json.JSONDecodeError):
+            log.error('Failure to compact the state journal')
+            return False
+        return self._rewrite([base, self._get_state(config)])
+
+    def _rewrite(self, records):
+
+        # the journal is replaced atomically by a new one with the given records, the old one is kept on failure
+        tmp_path = self._path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as file:
+                for record in records:
+                    file.write(json.dumps(record) + '\n')
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self._path)
+        except OSError:
+            log.error('Failure to rewrite the state journal')
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+        self._records = len(records)
+        return True
+
+    @staticmethod
+    def _get_state(config):
+        return {field: config[field] for field in STATE_FIELDS}
@@ -31,17 +31,16 @@ def db_duplicator():
 
     cursor = conn.cursor()
     query = f" SELECT * FROM p_session WHERE user_id = ? LIMIT 100"
-    res = cursor.execute(query, (0, ))
+    res = cursor.execute(query, (0, )).fetchall()
     for session in res:
         user_id = session[0]
         session_id = session[1]
-        json = session[2]
         session_id = prepared_session_counter + session_id
-        query = "INSERT INTO p_session (user_id, session_id, json) \
-                               VALUES(?, ?, ?) "
+        query = "INSERT INTO p_session (user_id, session_id, uuid, calendar, environment, command_thought, features) \
+                               VALUES(?, ?, ?, ?, ?, ?, ?) "
         cursor = conn.cursor()
 
-        cursor.execute(query, (user_id, session_id, json))
+        cursor.execute(query, (user_id, session_id) + tuple(session[2:]))
         conn.commit()
 
     conn.close()
@@ -64,7 +63,11 @@ def db_generator():
                 CREATE TABLE IF NOT EXISTS p_session ( \
                     user_id integer, \
                     session_id integer, \
-                    json blob, \
+                    uuid text, \
+                    calendar text, \
+                    environment text, \
+                    command_thought text, \
+                    features blob, \
                     primary key(user_id, session_id) \
                 )"
 
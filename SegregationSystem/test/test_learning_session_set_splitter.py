@@ -0,0 +1,84 @@
+import io
+import json
+
+import numpy as np
+
+from src.learning_session_set import LearningSessionSet
+from src.learning_session_set_splitter import LearningSessionSetSplitter
+
+CONFIG = {
+    'training_set_size': 0.7,
+    'validation_set_size': 0.2,
+    'testing_set_size': 0.1,
+    'split_seed': 0
+}
+
+
+def generate_dataset(command_thoughts):
+    sessions = len(command_thoughts)
+    return LearningSessionSet([str(i) for i in range(sessions)], ['home'] * sessions, ['indoor'] * sessions,
+                              command_thoughts, np.zeros((sessions, 4, 22)))
+
+
+# ===================== STRATIFIED SPLIT TEST ===================== #
+
+def test_split_sizes():
+    dataset = generate_dataset(['move', 'stop', 'left', 'right'] * 25)
+    splitted_dataset = LearningSessionSetSplitter(CONFIG).generate_training_validation_testing_set(dataset)
+
+    # 25 sessions of each command thought: 17.5 training, 5 validation and 2.5 testing
+    assert len(splitted_dataset['training']) in [68, 72]
+    assert len(splitted_dataset['validation']) == 20
+    assert len(splitted_dataset['testing']) == 100 - 20 - len(splitted_dataset['training'])
+    indexes = np.concatenate(list(splitted_dataset.values()))
+    assert sorted(indexes) == list(range(100))
+
+    # every set has the same proportions of command thoughts
+    for name in ['training', 'validation', 'testing']:
+        _, counts = np.unique(dataset.command_thoughts[splitted_dataset[name]], return_counts=True)
+        assert counts.max() - counts.min() == 0
+
+
+def test_rare_command_thought():
+    dataset = generate_dataset(['move'] * 60 + ['stop'] * 37 + ['left'] * 3)
+    splitted_dataset = LearningSessionSetSplitter(CONFIG).generate_training_validation_testing_set(dataset)
+    for indexes in splitted_dataset.values():
+        assert 'left' in dataset.command_thoughts[indexes]
+
+
+def test_seeded_split():
+    dataset = generate_dataset(['move', 'stop', 'left', 'right'] * 10)
+    first = LearningSessionSetSplitter(CONFIG).generate_training_validation_testing_set(dataset)
+    second = LearningSessionSetSplitter(CONFIG).generate_training_validation_testing_set(dataset)
+    for name in first:
+        assert np.array_equal(first[name], second[name])
+
+
+def test_materialize_split():
+    dataset = generate_dataset(['move', 'stop'] * 10)
+    splitted_dataset = LearningSessionSetSplitter(CONFIG).generate_training_validation_testing_set(dataset)
+    sessions = dataset.to_sessions(splitted_dataset['testing'])
+    assert [session['uuid'] for session in sessions] == [str(i) for i in splitted_dataset['testing']]
+    assert len(sessions[0]['features']['alpha']) == 22
+
+
+# ===================== COLUMNAR PAYLOAD TEST ===================== #
+
+def test_columnar_payload():
+    rng = np.random.default_rng(1)
+    command_thoughts = list(rng.choice(['move', 'stop', 'left', 'right'], 100))
+    dataset = LearningSessionSet([str(i) for i in range(100)], ['home'] * 100, ['indoor', 'outdoor'] * 50,
+                                 command_thoughts, rng.uniform(0, 10, (100, 4, 22)))
+    splitted_dataset = LearningSessionSetSplitter(CONFIG).generate_training_validation_testing_set(dataset)
+
+    payload = dataset.to_columnar_payload(splitted_dataset)
+    sessions = dataset.to_sessions(splitted_dataset['validation'])
+    assert len(payload) < len(json.dumps(sessions))
+
+    with np.load(io.BytesIO(payload), allow_pickle=False) as columns:
+        assert columns['validation_features'].dtype == np.float32
+        assert list(columns['validation_command_thoughts']) == [session['command_thought'] for session in sessions]
+        assert list(columns['validation_environments']) == \
+            [session['features']['environment'] for session in sessions]
+        assert np.array_equal(columns['validation_features'][:, 1], [session['features']['beta']
+                                                                     for session in sessions])
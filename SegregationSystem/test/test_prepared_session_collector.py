@@ -0,0 +1,269 @@
+import json
+import os
+import random
+import shutil
+import sqlite3
+
+import numpy as np
+import pytest
+
+from src.prepared_session_collector import PreparedSessionCollector
+
+CONFIG = {
+    'operative_mode': 'collecting_op_mode',
+    'user_id': 0,
+    'testing_mode': 'off',
+    'endpoint_ip': '127.0.0.1',
+    'endpoint_port': '5000',
+    'db_name': 'segregation_test.db',
+    'collecting_threshold': 10,
+    'training_set_size': 0.7,
+    'validation_set_size': 0.2,
+    'testing_set_size': 0.1
+}
+
+
+def generate_p_session(rng):
+    return {
+        'uuid': str(rng.randint(0, 10 ** 9)),
+        'features': {
+            'alpha': [rng.uniform(0, 10) for _ in range(22)],
+            'beta': [rng.uniform(0, 10) for _ in range(22)],
+            'delta': [rng.uniform(0, 10) for _ in range(22)],
+            'theta': [rng.uniform(0, 10) for _ in range(22)],
+            'environment': rng.choice(['indoor', 'outdoor'])
+        },
+        'calendar': rng.choice(['sport', 'shopping', 'home', 'working']),
+        'command_thought': rng.choice(['move', 'stop', 'left', 'right'])
+    }
+
+
+@pytest.fixture
+def segregation_dir(monkeypatch, tmp_path):
+    # the collector opens '../data' and '../schemas' from the working directory
+    os.makedirs(tmp_path / 'data')
+    os.makedirs(tmp_path / 'src')
+    shutil.copytree(os.path.join(os.path.dirname(__file__), '..', 'schemas'), tmp_path / 'schemas')
+    monkeypatch.chdir(tmp_path / 'src')
+    return tmp_path
+
+
+def collect(collector, p_sessions):
+    for p_session in p_sessions:
+        assert collector.store_prepared_session(p_session)
+        collector.increment_prepared_session_counter()
+
+
+# ===================== COLUMNAR STORAGE TEST ===================== #
+
+def test_store_and_load(segregation_dir):
+    rng = random.Random(0)
+    p_sessions = [generate_p_session(rng) for _ in range(10)]
+    collector = PreparedSessionCollector(dict(CONFIG))
+    collector.retrieve_counter()
+    collect(collector, p_sessions)
+
+    dataset = collector.load_learning_session_set()
+    assert len(dataset) == 10
+    assert dataset.features.dtype == np.float32
+    assert dataset.features.shape == (10, 4, 22)
+
+    # the sessions are loaded from the most recent one
+    loaded = {p_session['uuid']: p_session for p_session in dataset.to_sessions()}
+    for p_session in p_sessions:
+        assert loaded[p_session['uuid']]['command_thought'] == p_session['command_thought']
+        assert loaded[p_session['uuid']]['features']['environment'] == p_session['features']['environment']
+        assert np.allclose(loaded[p_session['uuid']]['features']['beta'], p_session['features']['beta'])
+
+
+def test_invalid_p_session(segregation_dir):
+    p_session = generate_p_session(random.Random(1))
+    p_session['features']['alpha'].pop()
+    collector = PreparedSessionCollector(dict(CONFIG))
+    assert not collector.store_prepared_session(p_session)
+
+
+def test_migrate_json_table(segregation_dir):
+    rng = random.Random(2)
+    p_sessions = [generate_p_session(rng) for _ in range(5)]
+    conn = sqlite3.connect(segregation_dir / 'data' / CONFIG['db_name'])
+    conn.execute("CREATE TABLE p_session (user_id integer, session_id integer, json blob, \
+                  primary key(user_id, session_id))")
+    conn.executemany("INSERT INTO p_session VALUES(?, ?, ?)",
+                     [(0, i, json.dumps(p_session)) for i, p_session in enumerate(p_sessions)])
+    conn.commit()
+    conn.close()
+
+    collector = PreparedSessionCollector(dict(CONFIG))
+    collector.retrieve_counter()
+    dataset = collector.load_learning_session_set()
+    assert len(dataset) == 5
+    assert set(dataset.uuids) == {p_session['uuid'] for p_session in p_sessions}
+
+    # command thought and environment aren't indexed
+    indexes = collector._conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' \
+                                       AND tbl_name = 'p_session' AND sql IS NOT NULL").fetchall()
+    assert indexes == [('p_session_uuid',)]
+
+
+def test_failed_json_migration(segregation_dir):
+    rng = random.Random(8)
+    db_path = segregation_dir / 'data' / CONFIG['db_name']
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE p_session (user_id integer, session_id integer, json blob, \
+                  primary key(user_id, session_id))")
+    conn.executemany("INSERT INTO p_session VALUES(?, ?, ?)",
+                     [(0, 0, json.dumps(generate_p_session(rng))), (0, 1, '{"uuid": ')])
+    conn.commit()
+    conn.close()
+
+    # the migration is rolled back as a whole, the json table is left as it was
+    with pytest.raises(json.JSONDecodeError):
+        PreparedSessionCollector(dict(CONFIG))
+    with sqlite3.connect(db_path) as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert tables == {'p_session'}
+        assert conn.execute("SELECT COUNT(*) FROM p_session WHERE json IS NOT NULL").fetchone()[0] == 2
+
+
+# ===================== RUNNING STATISTICS TEST ===================== #
+
+def check_statistics(statistics, dataset):
+    counts = {command: int(np.sum(dataset.command_thoughts == command)) for command in statistics.counts}
+    assert statistics.counts == counts
+    assert statistics.sessions == len(dataset)
+    assert np.allclose(statistics.mean, dataset.features.astype(np.float64).mean(axis=0))
+    assert np.allclose(statistics.get_variance(), dataset.features.astype(np.float64).var(axis=0, ddof=1))
+
+
+def test_running_statistics(segregation_dir):
+    rng = random.Random(3)
+    collector = PreparedSessionCollector(dict(CONFIG))
+    collector.retrieve_counter()
+    collect(collector, [generate_p_session(rng) for _ in range(6)])
+    check_statistics(collector.get_statistics(), collector.load_learning_session_set())
+
+    # the oldest sessions leave the learning session set
+    collect(collector, [generate_p_session(rng) for _ in range(9)])
+    check_statistics(collector.get_statistics(), collector.load_learning_session_set())
+
+    # the statistics are persisted with the prepared sessions
+    collector = PreparedSessionCollector(dict(CONFIG))
+    collector.retrieve_counter()
+    assert collector.get_statistics().sessions == 10
+    check_statistics(collector.get_statistics(), collector.load_learning_session_set())
+
+
+def test_statistics_threshold_change(segregation_dir):
+    rng = random.Random(4)
+    config = dict(CONFIG)
+    collector = PreparedSessionCollector(config)
+    collector.retrieve_counter()
+    collect(collector, [generate_p_session(rng) for _ in range(12)])
+
+    config['collecting_threshold'] = 40
+    collector.retrieve_counter()
+    assert collector.get_statistics().sessions == 12
+    check_statistics(collector.get_statistics(), collector.load_learning_session_set())
+
+
+# ===================== BATCH STORE TEST ===================== #
+
+def test_store_batch(segregation_dir):
+    rng = random.Random(5)
+    collector = PreparedSessionCollector(dict(CONFIG))
+    collector.retrieve_counter()
+    collect(collector, [generate_p_session(rng) for _ in range(4)])
+
+    p_sessions = [generate_p_session(rng) for _ in range(10)]
+    p_sessions[3]['command_thought'] = 'jump'
+    stored_sessions = collector.store_prepared_sessions(p_sessions)
+    assert stored_sessions == 9
+    collector.increment_prepared_session_counter(stored_sessions)
+    assert collector.check_collecting_threshold()
+
+    dataset = collector.load_learning_session_set()
+    assert set(dataset.uuids) == {p_session['uuid'] for p_session in p_sessions if p_session is not p_sessions[3]} | \
+        {dataset.uuids[-1]}
+    check_statistics(collector.get_statistics(), dataset)
+
+    collector.retrieve_counter()
+    assert collector.get_missing_sessions() == 1
+
+
+# ===================== TABLE LAYOUT TEST ===================== #
+
+def test_clustered_layout(segregation_dir):
+    collector = PreparedSessionCollector(dict(CONFIG))
+    cursor = collector._conn.cursor()
+    assert cursor.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+    # the counter lookup and the set loading are searches on the primary key
+    plan = cursor.execute("EXPLAIN QUERY PLAN SELECT session_id FROM p_session WHERE user_id = ? \
+                            ORDER BY session_id DESC LIMIT 1", (0,)).fetchall()
+    assert 'PRIMARY KEY' in plan[0][-1]
+    assert all('TEMP B-TREE' not in row[-1] for row in plan)
+
+
+def test_migrate_rowid_table(segregation_dir):
+    rng = random.Random(6)
+    conn = sqlite3.connect(segregation_dir / 'data' / CONFIG['db_name'])
+    conn.execute("CREATE TABLE p_session (user_id integer, session_id integer, uuid text, calendar text, \
+                  environment text, command_thought text, features blob, primary key(user_id, session_id))")
+    conn.commit()
+    conn.close()
+
+    collector = PreparedSessionCollector(dict(CONFIG))
+    assert collector._is_clustered()
+    collector.retrieve_counter()
+    collect(collector, [generate_p_session(rng) for _ in range(3)])
+    assert len(collector.load_learning_session_set()) == 3
+
+
+def test_failed_rowid_migration(segregation_dir):
+    db_path = segregation_dir / 'data' / CONFIG['db_name']
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE p_session (user_id integer, session_id integer, uuid text, calendar text, \
+                  environment text, command_thought text, features blob)")
+    conn.execute("CREATE INDEX p_session_uuid ON p_session (uuid)")
+    # duplicated keys can't be copied in the clustered table
+    conn.executemany("INSERT INTO p_session VALUES(?, ?, ?, ?, ?, ?, ?)",
+                     [(0, 0, 'a', 'home', 'indoor', 'move', b''), (0, 0, 'b', 'home', 'indoor', 'stop', b'')])
+    conn.commit()
+    conn.close()
+
+    # the migration is rolled back as a whole, the rowid table and its index are left as they were
+    with pytest.raises(SystemExit):
+        PreparedSessionCollector(dict(CONFIG))
+    with sqlite3.connect(db_path) as conn:
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+        assert names == {'p_session', 'p_session_uuid'}
+        assert conn.execute("SELECT COUNT(*) FROM p_session").fetchone()[0] == 2
+
+
+@pytest.mark.parametrize('mode', ['prune', 'archive'])
+def test_retention_policy(segregation_dir, mode):
+    rng = random.Random(7)
+    config = dict(CONFIG)
+    config['retention_policy'] = {'mode': mode, 'retained_users': 2, 'archive_db_name': 'archive_test.db'}
+    collector = PreparedSessionCollector(config)
+    for user_id in range(4):
+        config['user_id'] = user_id
+        collector.retrieve_counter()
+        collect(collector, [generate_p_session(rng) for _ in range(3)])
+
+    # the users 0 and 1 are removed, the actual user 2 and the most recent one are retained
+    config['user_id'] = 2
+    collector.retrieve_counter()
+    assert collector._prepared_session_counter == 3
+    users = collector._conn.execute("SELECT DISTINCT user_id FROM p_session").fetchall()
+    assert sorted(user[0] for user in users) == [2, 3]
+
+    archive_path = segregation_dir / 'data' / 'archive_test.db'
+    if mode == 'prune':
+        assert not archive_path.exists()
+    else:
+        archive = sqlite3.connect(archive_path)
+        assert archive.execute("SELECT user_id, count(*) FROM p_session GROUP BY user_id").fetchall() == \
+            [(0, 3), (1, 3)]
+        archive.close()
@@ -0,0 +1,52 @@
+import numpy as np
+
+from src.learning_session_set import LearningSessionSet
+from src.quality_analyzer import QualityAnalyzer
+
+CONFIG = {
+    'enabled': True,
+    'auto_accept': True,
+    'max_outlier_rate': 0.05,
+    'min_separability': 0.1,
+    'max_duplicate_rate': 0.0
+}
+
+
+def generate_dataset(rng, sessions, class_shift=0.0):
+    command_thoughts = rng.choice(['move', 'stop', 'left', 'right'], sessions)
+    codes = np.unique(command_thoughts, return_inverse=True)[1]
+    features = rng.lognormal(1, 0.3, (sessions, 4, 22)) + class_shift * codes[:, None, None]
+    return LearningSessionSet([str(i) for i in range(sessions)], ['home'] * sessions, ['indoor'] * sessions,
+                              command_thoughts, features)
+
+
+def test_scores():
+    rng = np.random.default_rng(0)
+    analyzer = QualityAnalyzer(CONFIG)
+
+    # the command thoughts of the separable dataset shift the band powers
+    scores = analyzer.analyze(generate_dataset(rng, 400, class_shift=2.0))
+    assert scores['separability'] > 1
+    assert scores['outlier_rate'] < 0.05
+    assert scores['duplicate_rate'] == 0
+    assert len(scores['channel_outlier_rates']) == 22
+    assert analyzer.is_accepted(scores)
+
+    scores = analyzer.analyze(generate_dataset(rng, 400))
+    assert scores['separability'] < 0.1
+    assert not analyzer.is_accepted(scores)
+
+
+def test_outliers_and_duplicates():
+    rng = np.random.default_rng(1)
+    analyzer = QualityAnalyzer(CONFIG)
+    dataset = generate_dataset(rng, 100, class_shift=2.0)
+    dataset.features[:10, 2, 5] = 1e4
+    dataset.features[90:] = dataset.features[:10]
+
+    scores = analyzer.analyze(dataset)
+    assert scores['channel_outlier_rates'][5] == 0.2
+    assert scores['duplicate_rate'] == 0.1
+    assert not analyzer.is_accepted(scores)
+    assert not QualityAnalyzer(dict(CONFIG, auto_accept=False)).is_accepted(analyzer.analyze(
+        generate_dataset(rng, 100, class_shift=2.0)))
@@ -0,0 +1,107 @@
+import json
+import os
+
+from src.state_journal import StateJournal
+
+CONFIG = {
+    'operative_mode': 'collecting_op_mode',
+    'user_id': 0,
+    'collecting_threshold': 100,
+    'db_name': 'segregation.db'
+}
+
+
+def test_replay(tmp_path):
+    path = str(tmp_path / 'segregation_state.journal')
+    config = dict(CONFIG)
+    journal = StateJournal(path)
+    assert not journal.replay(config)
+    config['operative_mode'] = 'balancing_op_mode'
+    journal.append(config)
+    config['operative_mode'] = 'collecting_op_mode'
+    config['user_id'] = 1
+    journal.append(config)
+
+    # a crash during an append leaves a truncated record
+    with open(path, 'a') as file:
+        file.write('{"operative_mode": "bal')
+
+    config = dict(CONFIG)
+    assert StateJournal(path).replay(config)
+    assert config['operative_mode'] == 'collecting_op_mode'
+    assert config['user_id'] == 1
+    assert config['db_name'] == 'segregation.db'
+
+
+def test_reconfiguration(tmp_path):
+    path = str(tmp_path / 'segregation_state.journal')
+    config = dict(CONFIG)
+    journal = StateJournal(path)
+    journal.replay(config)
+    config['operative_mode'] = 'splitting_op_mode'
+    journal.append(config)
+
+    # the configuration changed by hand is the new base of the journal
+    config = dict(CONFIG, user_id=7)
+    assert not StateJournal(path).replay(config)
+    assert config['operative_mode'] == 'collecting_op_mode'
+    with open(path) as file:
+        assert [json.loads(line) for line in file] == [{'operative_mode': 'collecting_op_mode', 'user_id': 7,
+                                                        'collecting_threshold': 100}]
+
+
+def test_compaction(tmp_path):
+    path = str(tmp_path / 'segregation_state.journal')
+    config = dict(CONFIG)
+    journal = StateJournal(path, max_records=5)
+    journal.replay(config)
+    for user_id in range(1, 20):
+        config['user_id'] = user_id
+        journal.append(config)
+
+    with open(path) as file:
+        assert len(file.readlines()) <= 5
+    config = dict(CONFIG)
+    StateJournal(path).replay(config)
+    assert config['user_id'] == 19
+
+
+def test_reset(tmp_path):
+    path = str(tmp_path / 'segregation_state.journal')
+    config = dict(CONFIG)
+    journal = StateJournal(path)
+    journal.replay(config)
+    config['user_id'] = 1
+    journal.append(config)
+
+    # the configuration edited back to the base of the journal is used only if the operator asks the reset
+    config = dict(CONFIG)
+    assert StateJournal(path).replay(config)
+    assert config['user_id'] == 1
+    config = dict(CONFIG)
+    assert not StateJournal(path).replay(config, reset=True)
+    assert config['user_id'] == 0
+    assert StateJournal(path).replay(config)
+    assert config['user_id'] == 0
+
+
+def test_rewrite_failure(tmp_path, monkeypatch):
+    path = str(tmp_path / 'segregation_state.journal')
+    config = dict(CONFIG)
+    journal = StateJournal(path, max_records=2)
+    journal.replay(config)
+    config['user_id'] = 1
+    journal.append(config)
+
+    def failing_replace(src, dst):
+        raise OSError
+
+    # the compaction fails: the old journal is kept and the state is appended to it
+    monkeypatch.setattr(os, 'replace', failing_replace)
+    config['user_id'] = 2
+    assert journal.append(config)
+    monkeypatch.undo()
+
+    assert not os.path.exists(path + '.tmp')
+    with open(path) as file:
+        assert [json.loads(line)['user_id'] for line in file] == [0, 1, 2]